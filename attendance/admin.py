@@ -1,6 +1,67 @@
 from django.contrib import admin
+from django.db import transaction
+from django.contrib.admin.views.main import ChangeList, ORDER_VAR
+from django.utils import timezone
 from django.utils.html import format_html
-from .models import Attendance, AttendanceActivity
+from .models import Attendance, AttendanceActivity, AttendanceDailyRollup
+from .checkout import bulk_check_out
+from .rollups import rebuild_rollup_days
+from nasa_library.pagination import keyset_paginate
+
+
+CURSOR_VAR = 'cursor'
+
+
+class AttendanceChangeList(ChangeList):
+    """
+    Changelist that pages the default (newest first) ordering with a keyset
+    cursor instead of COUNT + OFFSET. Sorting by a column falls back to the
+    regular numbered pagination.
+    """
+    
+    def __init__(self, request, *args, **kwargs):
+        self.cursor = request.GET.get(CURSOR_VAR)
+        self.keyset_page = None
+        super().__init__(request, *args, **kwargs)
+    
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+    
+    def get_query_string(self, new_params=None, remove=None):
+        # Changing filters, search or sorting always starts from the first page
+        return super().get_query_string(new_params, [*(remove or []), CURSOR_VAR])
+    
+    def get_results(self, request):
+        if ORDER_VAR in self.params or self.show_all:
+            return super().get_results(request)
+        
+        page = keyset_paginate(
+            self.queryset,
+            'check_in_time',
+            cursor=self.cursor,
+            per_page=self.list_per_page,
+        )
+        self.keyset_page = page
+        self.result_list = page.object_list
+        self.result_count = len(page)
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.can_show_all = False
+        self.multi_page = False
+        self.paginator = None
+    
+    @property
+    def first_page_url(self):
+        return self.get_query_string()
+    
+    @property
+    def next_page_url(self):
+        if not self.keyset_page or not self.keyset_page.has_next:
+            return None
+        return self.get_query_string({CURSOR_VAR: self.keyset_page.next_cursor})
 
 
 @admin.register(AttendanceActivity)
@@ -29,6 +90,8 @@ class AttendanceAdmin(admin.ModelAdmin):
     list_display = ['get_student_name', 'check_in_time_display', 'status_badge', 'duration_display', 'get_activities']
     list_filter = ['status', 'check_in_time', 'activities']
     search_fields = ['user__first_name', 'user__last_name', 'user__username']
+    list_select_related = ['user']
+    show_full_result_count = False
     readonly_fields = ['check_in_time', 'created_at', 'updated_at', 'duration_minutes', 'activity_list']
     date_hierarchy = 'check_in_time'
     
@@ -54,6 +117,39 @@ class AttendanceAdmin(admin.ModelAdmin):
     
     filter_horizontal = ['activities']
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('activities')
+    
+    def get_changelist(self, request, **kwargs):
+        return AttendanceChangeList
+    
+    # Edits can move a visit between days, classes and activities, so the
+    # rollup rows of every local day involved are rebuilt from the raw records.
+    # The admin runs the save and save_related in one transaction.
+    
+    def save_model(self, request, obj, form, change):
+        previous = None
+        if change:
+            previous = Attendance.objects.filter(pk=obj.pk).values_list('check_in_time', flat=True).first()
+        obj._rollup_days = {timezone.localdate(previous)} if previous else set()
+        super().save_model(request, obj, form, change)
+    
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        obj = form.instance
+        rebuild_rollup_days(obj._rollup_days | {timezone.localdate(obj.check_in_time)})
+    
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            super().delete_model(request, obj)
+            rebuild_rollup_days([timezone.localdate(obj.check_in_time)])
+    
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            days = [timezone.localdate(day) for day in queryset.datetimes('check_in_time', 'day')]
+            super().delete_queryset(request, queryset)
+            rebuild_rollup_days(days)
+    
     def get_student_name(self, obj):
         return obj.user.get_full_name() or obj.user.username
     get_student_name.short_description = "Student"
@@ -100,18 +196,28 @@ class AttendanceAdmin(admin.ModelAdmin):
         return format_html(result)
     activity_list.short_description = "Activities List"
     
-    def has_delete_permission(self, request):
+    def has_delete_permission(self, request, obj=None):
         # Prevent accidental deletion of attendance records
         return request.user.is_superuser
     
     actions = ['mark_as_checked_out']
     
     def mark_as_checked_out(self, request, queryset):
-        from django.utils import timezone
-        for record in queryset.filter(status='checked_in'):
-            record.check_out_time = timezone.now()
-            record.status = 'checked_out'
-            record.save()
-        self.message_user(request, f"{queryset.count()} records updated.")
+        updated = bulk_check_out(queryset)
+        self.message_user(request, f"{updated} records updated.")
     mark_as_checked_out.short_description = "Mark selected as checked out"
 
+
+@admin.register(AttendanceDailyRollup)
+class AttendanceDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ['date', 'kelas', 'activity', 'visits', 'unique_visitors', 'completed_visits', 'total_duration_minutes']
+    list_filter = ['date', 'kelas']
+    list_select_related = ['activity']
+    date_hierarchy = 'date'
+    
+    def has_add_permission(self, request):
+        # Rollups are maintained by check-in/check-out and rebuild_attendance_rollups
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,73 @@
+"""
+Set-based check-out shared by the closing-time cron job, the admin action
+and the librarian's force check-out button
+"""
+from django.db import transaction
+from django.db.models import F, Func, IntegerField, Value, DateTimeField
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .rollups import rebuild_rollup_days
+
+
+class MinutesBetween(Func):
+    """Whole minutes from the first datetime expression to the second, computed in SQL"""
+
+    arity = 2
+    output_field = IntegerField()
+
+    def _compile(self, compiler, template):
+        start, end = self.get_source_expressions()
+        start_sql, start_params = compiler.compile(start)
+        end_sql, end_params = compiler.compile(end)
+        sql = template % {'start': start_sql, 'end': end_sql}
+        # Parameters must follow the order the operands appear in the template
+        if template.index('%(start)s') < template.index('%(end)s'):
+            return sql, (*start_params, *end_params)
+        return sql, (*end_params, *start_params)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        # PostgreSQL
+        return self._compile(
+            compiler,
+            'FLOOR(EXTRACT(EPOCH FROM (%(end)s - %(start)s)) / 60)::integer'
+        )
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self._compile(
+            compiler,
+            'CAST(ROUND((julianday(%(end)s) - julianday(%(start)s)) * 86400000) AS INTEGER) / 60000'
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self._compile(compiler, 'TIMESTAMPDIFF(MINUTE, %(start)s, %(end)s)')
+
+
+def bulk_check_out(queryset, status='checked_out', at=None):
+    """
+    Check out every still-active record in `queryset` with a single UPDATE
+    and return the number of rows affected. Durations are computed in SQL
+    and the rollup rows of the local days the records were checked in on are
+    rebuilt in the same transaction.
+    """
+    if at is None:
+        at = timezone.now()
+
+    active = queryset.filter(status='checked_in').order_by()
+
+    with transaction.atomic():
+        days = [timezone.localdate(day) for day in active.datetimes('check_in_time', 'day')]
+        if not days:
+            return 0
+
+        checked_out_at = Value(at, output_field=DateTimeField())
+        affected = active.update(
+            check_out_time=checked_out_at,
+            status=status,
+            duration_minutes=Greatest(MinutesBetween(F('check_in_time'), checked_out_at), Value(0)),
+            updated_at=timezone.now(),
+        )
+
+        rebuild_rollup_days(days)
+
+    return affected
@@ -3,43 +3,53 @@ Cron jobs for attendance system
 Handles scheduled tasks like auto check-out at library closing time
 """
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, time
+import logging
+
 from .models import Attendance
+from .checkout import bulk_check_out
+
+logger = logging.getLogger(__name__)
+
+LIBRARY_CLOSING_TIME = time(15, 0)
 
 
-def auto_checkout_at_closing():
+def auto_checkout_at_closing(day=None, dry_run=False):
     """
     Automatically check out all students at 3:00 PM (library closing time)
-    This function is called by django-crontab every day at 15:00 (3:00 PM)
+    This function is called by django-crontab every day at 15:00 (3:00 PM).
+    Past days can be closed too, in which case visits are checked out at
+    that day's closing time. Returns the number of affected records.
     """
+    today = timezone.localdate()
+    if day is None:
+        day = today
+    
+    if day == today:
+        checked_out_at = timezone.now()
+    else:
+        checked_out_at = timezone.make_aware(datetime.combine(day, LIBRARY_CLOSING_TIME))
+    
+    active_records = Attendance.objects.for_local_day(day).active()
+    
     try:
-        # Get all active attendance records (students still checked in)
-        active_records = Attendance.objects.filter(
-            status='checked_in',
-            check_in_time__date=timezone.now().date()
-        )
-        
-        # Count before update
-        count = active_records.count()
+        if dry_run:
+            count = active_records.count()
+            logger.info(
+                'Auto check-out dry run: date=%s would_check_out=%d',
+                day, count,
+                extra={'date': day.isoformat(), 'would_check_out': count, 'dry_run': True}
+            )
+            return count
         
-        if count > 0:
-            now = timezone.now()
-            
-            # Update all active records with check-out time
-            for record in active_records:
-                record.check_out_time = now
-                record.status = 'checked_out'
-                record.save()
-            
-            # Log the action
-            print(f"[{now.strftime('%Y-%m-%d %H:%M:%S')}] Auto check-out completed: {count} students checked out")
-            with open('/tmp/attendance_cron.log', 'a') as log_file:
-                log_file.write(f"[{now.strftime('%Y-%m-%d %H:%M:%S')}] Auto check-out: {count} students\n")
-        else:
-            print(f"[{timezone.now().strftime('%Y-%m-%d %H:%M:%S')}] No active students to check out")
-            
-    except Exception as e:
-        error_msg = f"[{timezone.now().strftime('%Y-%m-%d %H:%M:%S')}] Error during auto check-out: {str(e)}\n"
-        print(error_msg)
-        with open('/tmp/attendance_cron.log', 'a') as log_file:
-            log_file.write(error_msg)
+        count = bulk_check_out(active_records, status='auto_checked_out', at=checked_out_at)
+        logger.info(
+            'Auto check-out completed: date=%s checked_out=%d at=%s',
+            day, count, checked_out_at.isoformat(),
+            extra={'date': day.isoformat(), 'checked_out': count, 'dry_run': False}
+        )
+        return count
+    
+    except Exception:
+        logger.exception('Error during auto check-out: date=%s', day, extra={'date': day.isoformat()})
+        raise
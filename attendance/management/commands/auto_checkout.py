@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from datetime import date
+
+from attendance.cron import auto_checkout_at_closing
+
+
+class Command(BaseCommand):
+    help = 'Check out every student still checked in on a given day (library closing time)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            type=str,
+            help='Day to close (YYYY-MM-DD). Defaults to today'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many students would be checked out'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            day = date.fromisoformat(options['date']) if options['date'] else None
+        except ValueError as e:
+            raise CommandError(f'Invalid date: {str(e)}')
+
+        count = auto_checkout_at_closing(day=day, dry_run=options['dry_run'])
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'Dry run: {count} students would be checked out'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✓ Checked out {count} students'))
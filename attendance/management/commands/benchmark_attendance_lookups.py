@@ -0,0 +1,106 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from contextlib import contextmanager
+from datetime import timedelta
+import random
+import time
+
+from attendance.models import Attendance
+
+
+@contextmanager
+def explicit_check_in_times():
+    """Let bulk_create keep the seeded check_in_time instead of auto_now_add"""
+    field = Attendance._meta.get_field('check_in_time')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare check_in_time__date lookups with local-day range lookups on a seeded '
+        'attendance table. Seeded rows are rolled back when the benchmark finishes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2_000_000, help='Number of attendance rows to seed')
+        parser.add_argument('--days', type=int, default=365, help='Spread the seeded visits over this many days')
+        parser.add_argument('--students', type=int, default=1500, help='Number of seeded students')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per query')
+        parser.add_argument('--batch-size', type=int, default=10_000, help='bulk_create batch size')
+
+    def handle(self, *args, **options):
+        if options['rows'] < 1 or options['days'] < 1 or options['students'] < 1:
+            raise CommandError('--rows, --days and --students must be positive')
+
+        with transaction.atomic():
+            self.seed(options)
+            self.compare(options['repeat'])
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('\n✓ Benchmark finished, seeded rows rolled back'))
+
+    def seed(self, options):
+        started = time.perf_counter()
+        users = User.objects.bulk_create(
+            User(username=f'benchmark-{i}') for i in range(options['students'])
+        )
+        now = timezone.now()
+        statuses = ['checked_out'] * 8 + ['auto_checked_out', 'checked_in']
+
+        with explicit_check_in_times():
+            batch = []
+            for _ in range(options['rows']):
+                batch.append(Attendance(
+                    user=random.choice(users),
+                    check_in_time=now - timedelta(minutes=random.randrange(options['days'] * 24 * 60)),
+                    status=random.choice(statuses),
+                ))
+                if len(batch) >= options['batch_size']:
+                    Attendance.objects.bulk_create(batch)
+                    batch = []
+            Attendance.objects.bulk_create(batch)
+
+        self.stdout.write(f"Seeded {options['rows']} rows in {time.perf_counter() - started:.1f}s")
+
+    def compare(self, repeat):
+        today = timezone.localdate()
+        user = Attendance.objects.values_list('user', flat=True).first()
+        cases = [
+            (
+                'active today',
+                Attendance.objects.filter(check_in_time__date=today, status='checked_in'),
+                Attendance.objects.for_local_day(today).active(),
+            ),
+            (
+                'visits today',
+                Attendance.objects.filter(check_in_time__date=today),
+                Attendance.objects.for_local_day(today),
+            ),
+            (
+                'student active today',
+                Attendance.objects.filter(user=user, check_in_time__date=today, status='checked_in'),
+                Attendance.objects.active_today(user),
+            ),
+        ]
+
+        for name, date_lookup, range_lookup in cases:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{name}'))
+            for label, queryset in [('__date', date_lookup), ('range', range_lookup)]:
+                timings = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    count = queryset.count()
+                    timings.append(time.perf_counter() - started)
+                timings.sort()
+                self.stdout.write(
+                    f'  {label:<7} count={count:<8} '
+                    f'median={timings[len(timings) // 2] * 1000:.2f}ms '
+                    f'min={timings[0] * 1000:.2f}ms'
+                )
+                self.stdout.write(f'          plan: {queryset.order_by().explain()}')
@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from datetime import date, timedelta
+
+from attendance.models import Attendance
+from attendance.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Backfill or repair the daily attendance rollup table from raw attendance records'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from',
+            dest='start',
+            type=str,
+            help='First day to rebuild (YYYY-MM-DD). Defaults to the first recorded visit'
+        )
+        parser.add_argument(
+            '--to',
+            dest='end',
+            type=str,
+            help='Last day to rebuild (YYYY-MM-DD). Defaults to today'
+        )
+        parser.add_argument(
+            '--chunk-days',
+            type=int,
+            default=31,
+            help='Number of days rebuilt per transaction'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            start = date.fromisoformat(options['start']) if options['start'] else None
+            end = date.fromisoformat(options['end']) if options['end'] else timezone.localdate()
+        except ValueError as e:
+            raise CommandError(f'Invalid date: {str(e)}')
+
+        if start is None:
+            first_visit = Attendance.objects.order_by('check_in_time').values_list('check_in_time', flat=True).first()
+            if first_visit is None:
+                self.stdout.write(self.style.WARNING('No attendance records found, nothing to rebuild'))
+                return
+            start = timezone.localdate(first_visit)
+
+        if options['chunk_days'] < 1:
+            raise CommandError('--chunk-days must be at least 1')
+
+        if start > end:
+            raise CommandError(f'--from ({start}) is after --to ({end})')
+
+        total_rows = 0
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(chunk_start + timedelta(days=options['chunk_days'] - 1), end)
+            rows = rebuild_rollups(chunk_start, chunk_end)
+            total_rows += rows
+            self.stdout.write(f'{chunk_start} → {chunk_end}: {rows} rollup rows')
+            chunk_start = chunk_end + timedelta(days=1)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'\n✓ Rebuilt {total_rows} rollup rows for {start} → {end}')
+        )
@@ -0,0 +1,35 @@
+# Generated by Django 6.0.2 on 2026-10-17 17:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Local (Asia/Jakarta) check-in date')),
+                ('kelas', models.CharField(blank=True, default='', help_text='Kelas/Class', max_length=50)),
+                ('visits', models.IntegerField(default=0)),
+                ('unique_visitors', models.IntegerField(default=0)),
+                ('completed_visits', models.IntegerField(default=0, help_text='Visits with a recorded duration')),
+                ('total_duration_minutes', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('activity', models.ForeignKey(blank=True, help_text='Empty for the all-activities total row', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='attendance.attendanceactivity')),
+            ],
+            options={
+                'verbose_name': 'Attendance Daily Rollup',
+                'verbose_name_plural': 'Attendance Daily Rollups',
+                'ordering': ['date', 'kelas'],
+                'indexes': [models.Index(fields=['date', 'activity'], name='attendance__date_512611_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('activity__isnull', True)), fields=('date', 'kelas'), name='unique_rollup_total_per_class_day'), models.UniqueConstraint(condition=models.Q(('activity__isnull', False)), fields=('date', 'kelas', 'activity'), name='unique_rollup_activity_per_class_day')],
+            },
+        ),
+    ]
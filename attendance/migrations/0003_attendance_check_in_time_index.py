@@ -0,0 +1,19 @@
+# Generated by Django 6.0.2 on 2026-10-17 17:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0002_attendance_daily_rollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['check_in_time'], name='attendance__check_i_377917_idx'),
+        ),
+    ]
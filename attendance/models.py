@@ -1,7 +1,50 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, time, timedelta
+
+
+def local_day_bounds(day):
+    """Return the half-open [start, end) aware datetime range of a local calendar day"""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+    return start, end
+
+
+class AttendanceQuerySet(models.QuerySet):
+    """
+    Local-day lookups expressed as check_in_time ranges instead of
+    check_in_time__date, so the (user, check_in_time) and
+    (status, check_in_time) indexes can be used
+    """
+    
+    def for_local_days(self, first_day, last_day):
+        """Visits checked in on local days first_day..last_day (inclusive)"""
+        start = local_day_bounds(first_day)[0]
+        end = local_day_bounds(last_day)[1]
+        return self.filter(check_in_time__gte=start, check_in_time__lt=end)
+    
+    def for_local_day(self, day):
+        """Visits checked in on the given local day"""
+        return self.for_local_days(day, day)
+    
+    def for_each_local_day(self, days):
+        """Visits checked in on any of the given local days"""
+        ranges = models.Q(pk__in=[])
+        for day in days:
+            start, end = local_day_bounds(day)
+            ranges |= models.Q(check_in_time__gte=start, check_in_time__lt=end)
+        return self.filter(ranges)
+    
+    def active(self):
+        return self.filter(status='checked_in')
+    
+    def active_today(self, user=None):
+        """Today's visits that are still checked in, optionally for one user"""
+        queryset = self.for_local_day(timezone.localdate()).active()
+        if user is not None:
+            queryset = queryset.filter(user=user)
+        return queryset
 
 
 class AttendanceActivity(models.Model):
@@ -45,11 +88,14 @@ class Attendance(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = AttendanceQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-check_in_time']
         indexes = [
             models.Index(fields=['user', 'check_in_time']),
             models.Index(fields=['status', 'check_in_time']),
+            models.Index(fields=['check_in_time']),
         ]
     
     def __str__(self):
@@ -77,3 +123,55 @@ class Attendance(models.Model):
         if hours > 0:
             return f"{hours}h {minutes}m"
         return f"{minutes}m"
+
+
+class AttendanceDailyRollup(models.Model):
+    """Pre-aggregated daily attendance per class and activity, used by the reports"""
+    
+    date = models.DateField(help_text="Local (Asia/Jakarta) check-in date")
+    kelas = models.CharField(max_length=50, blank=True, default='', help_text="Kelas/Class")
+    activity = models.ForeignKey(
+        AttendanceActivity,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='daily_rollups',
+        help_text="Empty for the all-activities total row"
+    )
+    
+    visits = models.IntegerField(default=0)
+    unique_visitors = models.IntegerField(default=0)
+    completed_visits = models.IntegerField(default=0, help_text="Visits with a recorded duration")
+    total_duration_minutes = models.IntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['date', 'kelas']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'kelas'],
+                condition=models.Q(activity__isnull=True),
+                name='unique_rollup_total_per_class_day',
+            ),
+            models.UniqueConstraint(
+                fields=['date', 'kelas', 'activity'],
+                condition=models.Q(activity__isnull=False),
+                name='unique_rollup_activity_per_class_day',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['date', 'activity']),
+        ]
+        verbose_name = "Attendance Daily Rollup"
+        verbose_name_plural = "Attendance Daily Rollups"
+    
+    def __str__(self):
+        activity = self.activity.name if self.activity_id else 'All activities'
+        return f"{self.date} - {self.kelas or 'No class'} - {activity}"
+    
+    @property
+    def avg_duration_minutes(self):
+        if not self.completed_visits:
+            return None
+        return self.total_duration_minutes // self.completed_visits
@@ -0,0 +1,150 @@
+"""
+Incremental maintenance of AttendanceDailyRollup
+Check-in and check-out apply small deltas to the rows of the visit's local day;
+callers run them in the same transaction as the attendance write, so the two
+cannot diverge. rebuild_rollups recomputes whole days from the raw attendance
+records; the admin uses it for the days an edit or delete touched. Each of
+them invalidates the cached dashboard statistics.
+"""
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models import F, Q, Count, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import Attendance, AttendanceDailyRollup
+from .services import DASHBOARD_CACHE
+from nasa_library.cache import invalidate_namespace
+
+
+def _kelas_for(user):
+    try:
+        return user.profile.kelas or ''
+    except ObjectDoesNotExist:
+        return ''
+
+
+def _invalidate_dashboard():
+    invalidate_namespace(DASHBOARD_CACHE)
+
+
+def _bump(day, kelas, activity_id, **deltas):
+    """Atomically add `deltas` to one rollup row, creating it if needed"""
+    row, _ = AttendanceDailyRollup.objects.get_or_create(
+        date=day,
+        kelas=kelas,
+        activity_id=activity_id,
+    )
+    AttendanceDailyRollup.objects.filter(pk=row.pk).update(
+        **{field: F(field) + value for field, value in deltas.items()}
+    )
+
+
+def record_check_in(attendance):
+    """Count a new visit. Call after the activities have been saved."""
+    day = timezone.localdate(attendance.check_in_time)
+    kelas = _kelas_for(attendance.user)
+    activity_ids = list(attendance.activities.values_list('id', flat=True))
+
+    # Activities of the student's earlier visits on the same day ({None} if
+    # they had no activities, empty if this is the first visit of the day)
+    earlier_activity_ids = set(
+        Attendance.objects.for_local_day(day).filter(
+            user_id=attendance.user_id
+        ).exclude(pk=attendance.pk).values_list('activities', flat=True)
+    )
+
+    with transaction.atomic():
+        _bump(day, kelas, None, visits=1, unique_visitors=int(not earlier_activity_ids))
+        for activity_id in activity_ids:
+            _bump(
+                day, kelas, activity_id,
+                visits=1,
+                unique_visitors=int(activity_id not in earlier_activity_ids)
+            )
+        _invalidate_dashboard()
+
+
+def record_check_out(attendance):
+    """Add a finished visit's duration to its day's rollup rows"""
+    if attendance.duration_minutes is None:
+        return
+
+    day = timezone.localdate(attendance.check_in_time)
+    kelas = _kelas_for(attendance.user)
+    activity_ids = list(attendance.activities.values_list('id', flat=True))
+
+    with transaction.atomic():
+        for activity_id in [None] + activity_ids:
+            _bump(
+                day, kelas, activity_id,
+                completed_visits=1,
+                total_duration_minutes=attendance.duration_minutes
+            )
+        _invalidate_dashboard()
+
+
+def rebuild_rollups(start, end):
+    """
+    Recompute the rollup rows for local days start..end (inclusive) from the
+    raw attendance records and return how many rows were written
+    """
+    return _rebuild(
+        Attendance.objects.for_local_days(start, end),
+        AttendanceDailyRollup.objects.filter(date__gte=start, date__lte=end),
+    )
+
+
+def rebuild_rollup_days(days):
+    """Like rebuild_rollups, for only the given (not necessarily consecutive) local days"""
+    days = sorted(set(days))
+    if not days:
+        return 0
+    return _rebuild(
+        Attendance.objects.for_each_local_day(days),
+        AttendanceDailyRollup.objects.filter(date__in=days),
+    )
+
+
+def _rebuild(records, stale_rollups):
+    totals = records.annotate(
+        day=TruncDate('check_in_time'),
+        kelas=Coalesce('user__profile__kelas', Value('')),
+    ).values('day', 'kelas').annotate(
+        visits=Count('id'),
+        unique_visitors=Count('user', distinct=True),
+        completed_visits=Count('id', filter=Q(duration_minutes__isnull=False)),
+        total_duration_minutes=Coalesce(Sum('duration_minutes'), 0),
+    ).order_by()
+
+    per_activity = Attendance.activities.through.objects.filter(
+        attendance__in=records
+    ).annotate(
+        day=TruncDate('attendance__check_in_time'),
+        kelas=Coalesce('attendance__user__profile__kelas', Value('')),
+    ).values('day', 'kelas', 'attendanceactivity_id').annotate(
+        visits=Count('id'),
+        unique_visitors=Count('attendance__user', distinct=True),
+        completed_visits=Count('id', filter=Q(attendance__duration_minutes__isnull=False)),
+        total_duration_minutes=Coalesce(Sum('attendance__duration_minutes'), 0),
+    ).order_by()
+
+    rollups = [
+        AttendanceDailyRollup(
+            date=row['day'],
+            kelas=row['kelas'],
+            activity_id=row.get('attendanceactivity_id'),
+            visits=row['visits'],
+            unique_visitors=row['unique_visitors'],
+            completed_visits=row['completed_visits'],
+            total_duration_minutes=row['total_duration_minutes'],
+        )
+        for row in list(totals) + list(per_activity)
+    ]
+
+    with transaction.atomic():
+        stale_rollups.delete()
+        AttendanceDailyRollup.objects.bulk_create(rollups, batch_size=500)
+        _invalidate_dashboard()
+
+    return len(rollups)
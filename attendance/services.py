@@ -0,0 +1,174 @@
+"""
+Service layer for attendance statistics
+Keeps the aggregation queries out of the views so the dashboard template
+and the JSON endpoint share the same fixed number of grouped queries.
+Historical figures are read from AttendanceDailyRollup (see rollups.py).
+The views read the dashboard figures through the 'dashboard' cache namespace,
+which rollups.py moves to a new version whenever a visit is recorded.
+"""
+from django.db.models import Count, Sum
+from django.utils import timezone
+from calendar import monthrange
+from datetime import date, timedelta
+
+from .models import Attendance, AttendanceDailyRollup
+from nasa_library.cache import get_or_compute
+
+
+DASHBOARD_CACHE = 'dashboard'
+DASHBOARD_STATS_TIMEOUT = 30
+
+
+def format_duration(minutes):
+    """Format a number of minutes as '1h 5m' / '45m', or '—' when empty"""
+    if not minutes:
+        return "—"
+    minutes = int(minutes)
+    hours = minutes // 60
+    remaining = minutes % 60
+    if hours > 0:
+        return f"{hours}h {remaining}m"
+    return f"{remaining}m"
+
+
+def get_dashboard_stats(today=None, days=7):
+    """
+    Compute dashboard statistics for a given day in 3 queries:
+    1. the live count of students still checked in
+    2. the N-day visit histogram (including today's total and average duration)
+       from the daily rollup
+    3. today's per-activity breakdown from the daily rollup
+    """
+    if today is None:
+        today = timezone.localdate()
+
+    # Students currently in the library
+    active_count = Attendance.objects.for_local_day(today).active().count()
+
+    # Last N days trend
+    start = today - timedelta(days=days - 1)
+    rows_by_day = {
+        row['date']: row
+        for row in AttendanceDailyRollup.objects.filter(
+            date__gte=start,
+            date__lte=today,
+            activity__isnull=True
+        ).values('date').annotate(
+            visits=Sum('visits'),
+            completed_visits=Sum('completed_visits'),
+            total_duration_minutes=Sum('total_duration_minutes'),
+        ).order_by()
+    }
+    daily_stats = []
+    for i in range(days):
+        current_date = start + timedelta(days=i)
+        daily_stats.append({
+            'date': current_date.strftime('%a'),
+            'day': current_date.isoformat(),
+            'count': rows_by_day.get(current_date, {}).get('visits', 0),
+        })
+
+    # Average visit duration today
+    today_row = rows_by_day.get(today, {})
+    avg_duration = None
+    if today_row.get('completed_visits'):
+        avg_duration = today_row['total_duration_minutes'] // today_row['completed_visits']
+
+    # Activity statistics
+    activity_rows = AttendanceDailyRollup.objects.filter(
+        date=today,
+        activity__is_active=True,
+        visits__gt=0
+    ).values(
+        'activity__name',
+        'activity__emoji',
+        'activity__order',
+    ).annotate(
+        count=Sum('visits')
+    ).order_by('activity__order', 'activity__name')
+    activity_stats = [
+        {
+            'name': f"{row['activity__emoji']} {row['activity__name']}",
+            'count': row['count'],
+        }
+        for row in activity_rows
+    ]
+
+    return {
+        'today': today,
+        'active_count': active_count,
+        'total_count': today_row.get('visits', 0),
+        'avg_duration_minutes': avg_duration,
+        'avg_duration': format_duration(avg_duration),
+        'daily_stats': daily_stats,
+        'activity_stats': activity_stats,
+    }
+
+
+def get_cached_dashboard_stats(today=None, days=7):
+    """get_dashboard_stats, cached until the next check-in or check-out"""
+    if today is None:
+        today = timezone.localdate()
+    return get_or_compute(
+        DASHBOARD_CACHE,
+        [today.isoformat(), days],
+        lambda: get_dashboard_stats(today, days),
+        timeout=DASHBOARD_STATS_TIMEOUT,
+    )
+
+
+def get_monthly_report(year, month):
+    """
+    Compute the monthly report in 3 queries: the daily breakdown from the
+    daily rollup, plus the month's unique visitors and top 10 visitors, which
+    cannot be derived from per-day totals
+    """
+    first_day = date(year, month, 1)
+    last_day = date(year, month, monthrange(year, month)[1])
+
+    monthly_records = Attendance.objects.for_local_days(first_day, last_day)
+
+    # Daily breakdown
+    rows_by_day = {
+        row['date']: row
+        for row in AttendanceDailyRollup.objects.filter(
+            date__gte=first_day,
+            date__lte=last_day,
+            activity__isnull=True
+        ).values('date').annotate(
+            visitors=Sum('unique_visitors'),
+            visits=Sum('visits'),
+        ).order_by()
+    }
+    days_in_month = (last_day - first_day).days + 1
+    daily_breakdown = []
+    for offset in range(days_in_month):
+        current_date = first_day + timedelta(days=offset)
+        row = rows_by_day.get(current_date, {})
+        daily_breakdown.append({
+            'date': current_date,
+            'visitors': row.get('visitors', 0),
+            'visits': row.get('visits', 0),
+        })
+
+    # Statistics
+    total_visits = sum(day['visits'] for day in daily_breakdown)
+    total_unique_visitors = monthly_records.values('user').distinct().count()
+    avg_daily_visitors = total_unique_visitors / days_in_month
+
+    # Top readers (most visits)
+    top_students = list(
+        monthly_records.values('user__first_name', 'user__last_name').annotate(
+            visit_count=Count('id')
+        ).order_by('-visit_count')[:10]
+    )
+
+    return {
+        'first_day': first_day,
+        'last_day': last_day,
+        'total_unique_visitors': total_unique_visitors,
+        'total_visits': total_visits,
+        'avg_daily_visitors': round(avg_daily_visitors, 1),
+        'daily_breakdown': daily_breakdown,
+        'top_students': top_students,
+    }
@@ -1,3 +1,364 @@
 from django.test import TestCase
+from django.urls import reverse
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.utils import timezone
+from datetime import date, datetime, time, timedelta
+import base64
+import json
 
-# Create your tests here.
+from authentication.models import UserProfile
+
+from .models import Attendance, AttendanceActivity, AttendanceDailyRollup
+from .rollups import record_check_in, record_check_out, rebuild_rollups
+from .services import get_dashboard_stats, get_cached_dashboard_stats, get_monthly_report
+from .cron import auto_checkout_at_closing
+from .checkout import bulk_check_out
+from .admin import AttendanceAdmin
+
+
+class DashboardStatsTests(TestCase):
+    """Dashboard statistics must cost a fixed number of queries"""
+
+    def setUp(self):
+        cache.clear()
+        self.student = User.objects.create_user(username='1001', password='1001')
+
+    def seed(self, activity_count, day_count):
+        offset = AttendanceActivity.objects.count()
+        activities = [
+            AttendanceActivity.objects.create(name=f'Activity {offset + i}', order=offset + i)
+            for i in range(activity_count)
+        ]
+        now = timezone.now()
+        for day in range(day_count):
+            record = Attendance.objects.create(user=self.student)
+            Attendance.objects.filter(pk=record.pk).update(check_in_time=now - timedelta(days=day))
+            record.activities.set(activities)
+        today = timezone.localdate()
+        rebuild_rollups(today - timedelta(days=day_count), today)
+        return activities
+
+    def test_counts(self):
+        activities = self.seed(activity_count=2, day_count=3)
+        stats = get_dashboard_stats()
+
+        self.assertEqual(stats['total_count'], 1)
+        self.assertEqual(stats['active_count'], 1)
+        self.assertEqual(sum(day['count'] for day in stats['daily_stats']), 3)
+        self.assertEqual(
+            [stat['name'] for stat in stats['activity_stats']],
+            [str(activity) for activity in activities]
+        )
+
+    def test_query_count_is_constant(self):
+        self.seed(activity_count=1, day_count=1)
+        with self.assertNumQueries(3):
+            get_dashboard_stats()
+
+        self.seed(activity_count=5, day_count=7)
+        with self.assertNumQueries(3):
+            get_dashboard_stats()
+
+    def test_cached_until_a_visit_is_recorded(self):
+        self.seed(activity_count=1, day_count=1)
+        self.assertEqual(get_cached_dashboard_stats()['total_count'], 1)
+        with self.assertNumQueries(0):
+            get_cached_dashboard_stats()
+
+        self.seed(activity_count=1, day_count=1)
+        self.assertEqual(get_cached_dashboard_stats()['total_count'], 2)
+
+
+class DailyRollupTests(TestCase):
+    """Incremental rollup maintenance must agree with a full rebuild"""
+
+    def setUp(self):
+        self.students = [
+            User.objects.create_user(username=f'200{i}', password='x')
+            for i in range(2)
+        ]
+        self.reading = AttendanceActivity.objects.create(name='Reading', order=1)
+        self.homework = AttendanceActivity.objects.create(name='Homework', order=2)
+
+    def snapshot(self):
+        return sorted(
+            AttendanceDailyRollup.objects.values_list(
+                'date', 'kelas', 'activity_id', 'visits', 'unique_visitors',
+                'completed_visits', 'total_duration_minutes'
+            ),
+            key=lambda row: (row[0], row[1], row[2] or 0)
+        )
+
+    def visit(self, student, activities, minutes=None):
+        record = Attendance.objects.create(user=student)
+        record.activities.set(activities)
+        record_check_in(record)
+        if minutes is not None:
+            record.check_out_time = record.check_in_time + timedelta(minutes=minutes)
+            record.status = 'checked_out'
+            record.save()
+            record_check_out(record)
+        return record
+
+    def test_incremental_matches_rebuild(self):
+        first, second = self.students
+        self.visit(first, [self.reading], minutes=30)
+        self.visit(first, [self.reading, self.homework], minutes=10)
+        self.visit(second, [self.homework])
+
+        incremental = self.snapshot()
+        today = timezone.localdate()
+        rebuild_rollups(today, today)
+
+        self.assertEqual(incremental, self.snapshot())
+        total = AttendanceDailyRollup.objects.get(activity__isnull=True)
+        self.assertEqual((total.visits, total.unique_visitors), (3, 2))
+        self.assertEqual(total.avg_duration_minutes, 20)
+
+
+class AutoCheckoutTests(TestCase):
+    """Closing-time check-out must be a single set-based update"""
+
+    def setUp(self):
+        self.student = User.objects.create_user(username='3001', password='x')
+
+    def test_bulk_checkout(self):
+        day = date(2026, 1, 5)
+        for check_in in [time(13, 30), time(14, 15)]:
+            record = Attendance.objects.create(user=self.student)
+            Attendance.objects.filter(pk=record.pk).update(
+                check_in_time=timezone.make_aware(datetime.combine(day, check_in))
+            )
+        Attendance.objects.create(user=self.student, status='checked_out')
+
+        self.assertEqual(auto_checkout_at_closing(day, dry_run=True), 2)
+        self.assertEqual(auto_checkout_at_closing(day), 2)
+        self.assertEqual(auto_checkout_at_closing(day), 0)
+
+        closed = Attendance.objects.filter(status='auto_checked_out')
+        self.assertEqual(sorted(closed.values_list('duration_minutes', flat=True)), [45, 90])
+        self.assertEqual(
+            AttendanceDailyRollup.objects.get(activity__isnull=True).total_duration_minutes,
+            135
+        )
+
+    def test_force_checkout_reports_affected_rows(self):
+        records = [Attendance.objects.create(user=self.student) for _ in range(3)]
+        Attendance.objects.filter(pk=records[0].pk).update(status='checked_out')
+
+        updated = bulk_check_out(Attendance.objects.filter(pk__in=[r.pk for r in records]))
+
+        self.assertEqual(updated, 2)
+        self.assertFalse(Attendance.objects.filter(status='checked_in').exists())
+
+    def test_checkout_rebuilds_only_the_days_touched(self):
+        # 23:30 local on the 4th and 00:15 local on the 20th, with an old
+        # rollup row in between that must be left alone
+        first, last = date(2026, 1, 4), date(2026, 1, 20)
+        for day, check_in in [(first, time(23, 30)), (last, time(0, 15))]:
+            record = Attendance.objects.create(user=self.student)
+            Attendance.objects.filter(pk=record.pk).update(
+                check_in_time=timezone.make_aware(datetime.combine(day, check_in))
+            )
+        AttendanceDailyRollup.objects.create(date=date(2026, 1, 10), kelas='', visits=7)
+
+        bulk_check_out(Attendance.objects.all(), at=timezone.make_aware(datetime(2026, 1, 20, 1, 0)))
+
+        self.assertEqual(
+            list(AttendanceDailyRollup.objects.order_by('date').values_list('date', 'visits')),
+            [(first, 1), (date(2026, 1, 10), 7), (last, 1)]
+        )
+
+
+
+def local(year, month, day, hour, minute):
+    return timezone.make_aware(datetime(year, month, day, hour, minute))
+
+
+class MonthBoundaryTests(TestCase):
+    """Local (Asia/Jakarta) days and months, around midnight and month ends"""
+
+    def setUp(self):
+        cache.clear()
+        self.budi = User.objects.create_user(username='5001', first_name='Budi')
+        self.siti = User.objects.create_user(username='5002', first_name='Siti')
+        librarian = User.objects.create_user(username='pustakawan')
+        UserProfile.objects.create(user=librarian, role='librarian')
+        self.librarian = librarian
+
+        # 00:10 on 1 February in Jakarta is still 31 January in UTC
+        self.last_january = self.visit(self.budi, local(2026, 1, 31, 23, 50))
+        self.first_february = self.visit(self.siti, local(2026, 2, 1, 0, 10))
+        self.mid_february = self.visit(self.budi, local(2026, 2, 15, 12, 0), checked_out=True)
+        self.last_february = self.visit(self.siti, local(2026, 2, 28, 23, 59), checked_out=True)
+        self.first_march = self.visit(self.budi, local(2026, 3, 1, 0, 5), checked_out=True)
+        rebuild_rollups(date(2026, 1, 31), date(2026, 3, 1))
+
+    def visit(self, user, check_in_time, checked_out=False):
+        record = Attendance.objects.create(user=user, status='checked_out' if checked_out else 'checked_in')
+        Attendance.objects.filter(pk=record.pk).update(check_in_time=check_in_time)
+        return record.pk
+
+    def test_local_day_lookups(self):
+        def pks(queryset):
+            return sorted(queryset.values_list('pk', flat=True))
+
+        self.assertEqual(pks(Attendance.objects.for_local_day(date(2026, 1, 31))), [self.last_january])
+        self.assertEqual(pks(Attendance.objects.for_local_day(date(2026, 2, 1))), [self.first_february])
+        self.assertEqual(
+            pks(Attendance.objects.for_local_days(date(2026, 2, 1), date(2026, 2, 28))),
+            [self.first_february, self.mid_february, self.last_february]
+        )
+        self.assertEqual(
+            pks(Attendance.objects.for_each_local_day([date(2026, 1, 31), date(2026, 3, 1)])),
+            [self.last_january, self.first_march]
+        )
+
+    def test_active_today_after_midnight(self):
+        with mock.patch('django.utils.timezone.now', return_value=local(2026, 2, 1, 0, 30)):
+            # Last night's visit is still checked in but belongs to yesterday
+            self.assertEqual(
+                list(Attendance.objects.active_today().values_list('pk', flat=True)),
+                [self.first_february]
+            )
+            self.assertFalse(Attendance.objects.active_today(user=self.budi).exists())
+
+    def test_monthly_report(self):
+        with self.assertNumQueries(3):
+            report = get_monthly_report(2026, 2)
+
+        breakdown = report['daily_breakdown']
+        self.assertEqual(
+            (len(breakdown), breakdown[0]['date'], breakdown[-1]['date']),
+            (28, date(2026, 2, 1), date(2026, 2, 28))
+        )
+        self.assertEqual([breakdown[0]['visits'], breakdown[14]['visits'], breakdown[27]['visits']], [1, 1, 1])
+        self.assertEqual((report['total_visits'], report['total_unique_visitors']), (3, 2))
+        self.assertEqual(
+            [(row['user__first_name'], row['visit_count']) for row in report['top_students']],
+            [('Siti', 2), ('Budi', 1)]
+        )
+
+    def test_average_is_over_every_day_of_the_month(self):
+        for i in range(19):
+            user = User.objects.create_user(username=f'51{i:02d}')
+            self.visit(user, local(2026, 1, 10, 9, 0))
+
+        # 20 visitors over 31 days, not 30
+        self.assertEqual(get_monthly_report(2026, 1)['avg_daily_visitors'], 0.6)
+
+    def test_monthly_report_view(self):
+        self.client.force_login(self.librarian)
+        response = self.client.get(reverse('attendance:monthly_report', args=[2026, 2]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_visits'], 3)
+        self.assertEqual(
+            [record.pk for record in response.context['records']],
+            [self.last_february, self.mid_february, self.first_february]
+        )
+
+        self.client.force_login(self.budi)
+        response = self.client.get(reverse('attendance:monthly_report', args=[2026, 2]))
+        self.assertNotEqual(response.status_code, 200)
+
+class CheckInViewTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.student = User.objects.create_user(username='4501')
+        UserProfile.objects.create(user=self.student, role='student', kelas='X 1')
+        self.client.force_login(self.student)
+
+    def test_failed_rollup_update_rolls_back_the_check_in(self):
+        with mock.patch('attendance.views.record_check_in', side_effect=RuntimeError('rollup down')):
+            with self.assertRaises(RuntimeError):
+                self.client.post(reverse('attendance:check_in'), {'custom_activity': 'Membaca'})
+        self.assertFalse(Attendance.objects.exists())
+
+        self.client.post(reverse('attendance:check_in'), {'custom_activity': 'Membaca'})
+        self.assertEqual(AttendanceDailyRollup.objects.get(activity__isnull=True).visits, 1)
+
+
+class AttendanceAdminTests(TestCase):
+    """The attendance changelist pages newest first with a keyset cursor"""
+
+    def setUp(self):
+        admin_user = User.objects.create_superuser(username='admin', password='x')
+        self.client.force_login(admin_user)
+        self.url = reverse('admin:attendance_attendance_changelist')
+        self.budi = User.objects.create_user(username='4001', first_name='Budi')
+        self.siti = User.objects.create_user(username='4002', first_name='Siti')
+
+        # Ten visits, one per hour, alternating between the two students
+        start = timezone.make_aware(datetime(2026, 2, 2, 8, 0))
+        self.records = []
+        for hour in range(10):
+            record = Attendance.objects.create(user=self.budi if hour % 2 else self.siti)
+            Attendance.objects.filter(pk=record.pk).update(check_in_time=start + timedelta(hours=hour))
+            self.records.append(record.pk)
+        Attendance.objects.filter(pk__in=self.records[:2]).update(status='checked_out')
+
+        patcher = mock.patch.object(AttendanceAdmin, 'list_per_page', 3)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def page(self, params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.context['cl']
+
+    def test_first_and_next_page(self):
+        cl = self.page({})
+        self.assertEqual([r.pk for r in cl.result_list], self.records[:-4:-1])
+        self.assertIsNotNone(cl.keyset_page.next_cursor)
+
+        cl = self.page({'cursor': cl.keyset_page.next_cursor})
+        self.assertEqual([r.pk for r in cl.result_list], self.records[-4:-7:-1])
+
+    def test_cursor_keeps_filter_and_search(self):
+        params = {'status__exact': 'checked_in', 'q': 'Budi'}
+        cl = self.page(params)
+        # Budi's still-active visits are the odd hours from 3 on
+        self.assertEqual([r.pk for r in cl.result_list], [self.records[9], self.records[7], self.records[5]])
+        self.assertIn('status__exact=checked_in', cl.next_page_url)
+        self.assertIn('q=Budi', cl.next_page_url)
+
+        cl = self.page({**params, 'cursor': cl.keyset_page.next_cursor})
+        self.assertEqual([r.pk for r in cl.result_list], [self.records[3]])
+        self.assertFalse(cl.keyset_page.has_next)
+
+    def test_tampered_cursor_shows_the_first_page(self):
+        first = [r.pk for r in self.page({}).result_list]
+        forged = base64.urlsafe_b64encode(json.dumps(['v', 'not a date', 1]).encode()).decode()
+        for cursor in ['garbage', '!!!', forged]:
+            cl = self.page({'cursor': cursor})
+            self.assertEqual([r.pk for r in cl.result_list], first)
+
+    def test_edits_and_deletes_rebuild_the_rollup(self):
+        day = date(2026, 2, 2)
+        record = Attendance.objects.get(pk=self.records[9])
+        response = self.client.post(reverse('admin:attendance_attendance_change', args=[record.pk]), {
+            'user': record.user_id,
+            'check_out_time_0': '2026-02-02',
+            'check_out_time_1': '18:30:00',
+            'custom_activity': '',
+            'status': 'checked_out',
+        })
+        self.assertEqual(response.status_code, 302)
+
+        total = AttendanceDailyRollup.objects.get(date=day, activity__isnull=True)
+        self.assertEqual((total.visits, total.completed_visits, total.total_duration_minutes), (10, 1, 90))
+
+        self.client.post(reverse('admin:attendance_attendance_delete', args=[record.pk]), {'post': 'yes'})
+        total = AttendanceDailyRollup.objects.get(date=day, activity__isnull=True)
+        self.assertEqual((total.visits, total.completed_visits), (9, 0))
+
+    def test_page_costs_a_fixed_number_of_queries(self):
+        cursor = self.page({}).keyset_page.next_cursor
+        # Session, user, activity filter choices, the page (no COUNT), its
+        # activities and the two date hierarchy queries
+        with self.assertNumQueries(7):
+            self.client.get(self.url, {'cursor': cursor})
@@ -3,34 +3,31 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.views.decorators.http import require_http_methods
 from django.http import JsonResponse
+from django.db import transaction
 from django.utils import timezone
 from django.db.models import Q, Count, Avg
-from datetime import datetime, timedelta, date
+from datetime import datetime, date
+from calendar import monthrange
 import json
 
 from .models import Attendance, AttendanceActivity
 from .forms import CheckInForm, CheckOutForm
-from authentication.models import UserProfile
+from .services import get_cached_dashboard_stats, get_monthly_report
+from .rollups import record_check_in, record_check_out
+from .checkout import bulk_check_out
+from authentication.decorators import role_required, student_required, staff_required
+from nasa_library.pagination import keyset_paginate
+
+
+RECORDS_PER_PAGE = 50
 
 
 @login_required
+@student_required(message="Only students can check in to the library.")
 def check_in_view(request):
     """Student check-in page"""
-    # Get user profile
-    user_profile = get_object_or_404(UserProfile, user=request.user)
-    
-    # Check if user is a student
-    if not user_profile.is_student():
-        messages.error(request, "Only students can check in to the library.")
-        return redirect('main:mainpage')
-    
     # Check if already checked in today
-    today = timezone.now().date()
-    active_attendance = Attendance.objects.filter(
-        user=request.user,
-        check_in_time__date=today,
-        status='checked_in'
-    ).first()
+    active_attendance = Attendance.objects.active_today(request.user).first()
     
     if active_attendance:
         # Already checked in, show check-out option
@@ -41,8 +38,11 @@ def check_in_view(request):
         if form.is_valid():
             attendance = form.save(commit=False)
             attendance.user = request.user
-            attendance.save()
-            form.save_m2m()
+            # The visit and its rollup deltas are written together or not at all
+            with transaction.atomic():
+                attendance.save()
+                form.save_m2m()
+                record_check_in(attendance)
             
             messages.success(
                 request,
@@ -57,7 +57,7 @@ def check_in_view(request):
     
     context = {
         'form': form,
-        'user_profile': user_profile,
+        'user_profile': request.profile,
         'reading_stats': reading_stats,
     }
     
@@ -67,14 +67,8 @@ def check_in_view(request):
 @login_required
 def active_attendance_view(request):
     """Show active attendance and provide check-out option"""
-    today = timezone.now().date()
-    
     # Get current active attendance
-    active_attendance = Attendance.objects.filter(
-        user=request.user,
-        check_in_time__date=today,
-        status='checked_in'
-    ).first()
+    active_attendance = Attendance.objects.active_today(request.user).first()
     
     if not active_attendance:
         messages.info(request, "You are not currently checked in.")
@@ -85,7 +79,9 @@ def active_attendance_view(request):
         if form.is_valid():
             active_attendance.check_out_time = timezone.now()
             active_attendance.status = 'checked_out'
-            active_attendance.save()
+            with transaction.atomic():
+                active_attendance.save()
+                record_check_out(active_attendance)
             
             messages.success(
                 request,
@@ -114,72 +110,10 @@ def active_attendance_view(request):
 
 
 @login_required
+@staff_required(message="You don't have permission to access this page.")
 def dashboard_view(request):
     """Dashboard for librarian and teacher - real-time statistics"""
-    user_profile = get_object_or_404(UserProfile, user=request.user)
-    
-    # Check if user has authorization
-    if not user_profile.is_librarian() and not user_profile.is_teacher():
-        messages.error(request, "You don't have permission to access this page.")
-        return redirect('main:mainpage')
-    
-    today = timezone.now().date()
-    
-    # Real-time statistics
-    active_visitors = Attendance.objects.filter(
-        check_in_time__date=today,
-        status='checked_in'
-    ).count()
-    
-    total_visitors_today = Attendance.objects.filter(
-        check_in_time__date=today
-    ).count()
-    
-    # Last 7 days trend
-    week_ago = today - timedelta(days=6)
-    daily_stats = []
-    for i in range(7):
-        current_date = week_ago + timedelta(days=i)
-        count = Attendance.objects.filter(check_in_time__date=current_date).count()
-        daily_stats.append({
-            'date': current_date.strftime('%a'),
-            'count': count
-        })
-    
-    # Activity statistics
-    activity_stats = []
-    activities = AttendanceActivity.objects.filter(is_active=True)
-    for activity in activities:
-        count = Attendance.objects.filter(
-            check_in_time__date=today,
-            activities=activity
-        ).count()
-        if count > 0:
-            activity_stats.append({
-                'name': str(activity),
-                'count': count
-            })
-    
-    # Average visit duration today
-    avg_duration = Attendance.objects.filter(
-        check_in_time__date=today,
-        status__in=['checked_out', 'auto_checked_out']
-    ).aggregate(avg=Avg('duration_minutes'))
-    avg_duration_display = "—"
-    if avg_duration['avg']:
-        avg_minutes = int(avg_duration['avg'])
-        hours = avg_minutes // 60
-        minutes = avg_minutes % 60
-        if hours > 0:
-            avg_duration_display = f"{hours}h {minutes}m"
-        else:
-            avg_duration_display = f"{minutes}m"
-    
-    # Get all active visitors with details
-    active_visitor_list = Attendance.objects.select_related('user__profile').filter(
-        check_in_time__date=today,
-        status='checked_in'
-    ).order_by('-check_in_time')
+    today = timezone.localdate()
     
     # Monthly recap option
     if request.method == 'POST' and 'generate_monthly' in request.POST:
@@ -188,14 +122,22 @@ def dashboard_view(request):
         # This is a placeholder for monthly report generation
         return monthly_report_view(request, int(year), int(month))
     
+    # Real-time statistics, trend and activity breakdown
+    stats = get_cached_dashboard_stats(today)
+    
+    # Get all active visitors with details
+    active_visitor_list = Attendance.objects.select_related('user__profile').for_local_day(
+        today
+    ).active().order_by('-check_in_time')
+    
     context = {
         'active_visitors': active_visitor_list,
-        'active_count': active_visitors,
-        'total_count': total_visitors_today,
-        'daily_stats': daily_stats,
-        'activity_stats': activity_stats,
-        'avg_duration': avg_duration_display,
-        'user_profile': user_profile,
+        'active_count': stats['active_count'],
+        'total_count': stats['total_count'],
+        'daily_stats': stats['daily_stats'],
+        'activity_stats': stats['activity_stats'],
+        'avg_duration': stats['avg_duration'],
+        'user_profile': request.profile,
         'today': today,
     }
     
@@ -203,56 +145,43 @@ def dashboard_view(request):
 
 
 @login_required
+@staff_required(response='json')
+def dashboard_stats_view(request):
+    """JSON endpoint with the same statistics shown on the dashboard"""
+    stats = get_cached_dashboard_stats()
+    stats['today'] = stats['today'].isoformat()
+    
+    return JsonResponse({'status': 'success', 'stats': stats})
+
+
+@login_required
+@staff_required(message="You don't have permission to access this page.")
 def monthly_report_view(request, year, month):
     """Generate monthly attendance report"""
-    user_profile = get_object_or_404(UserProfile, user=request.user)
-    
-    if not user_profile.is_librarian() and not user_profile.is_teacher():
-        messages.error(request, "You don't have permission to access this page.")
-        return redirect('main:mainpage')
-    
-    from calendar import monthrange
-    
-    first_day = date(year, month, 1)
-    last_day = date(year, month, monthrange(year, month)[1])
-    
-    # Get all attendance records for the month
-    monthly_records = Attendance.objects.filter(
-        check_in_time__date__gte=first_day,
-        check_in_time__date__lte=last_day
-    ).select_related('user__profile')
-    
-    # Statistics
-    total_unique_visitors = monthly_records.values('user').distinct().count()
-    total_visits = monthly_records.count()
-    avg_daily_visitors = total_unique_visitors / (last_day - first_day).days if (last_day - first_day).days > 0 else 0
-    
-    # Daily breakdown
-    daily_breakdown = []
-    for day in range(1, (last_day - first_day).days + 2):
-        current_date = first_day + timedelta(days=day-1)
-        day_records = monthly_records.filter(check_in_time__date=current_date)
-        daily_breakdown.append({
-            'date': current_date,
-            'visitors': day_records.values('user').distinct().count(),
-            'visits': day_records.count(),
-        })
-    
-    # Top readers (most visits)
-    top_students = monthly_records.values('user__first_name', 'user__last_name').annotate(
-        visit_count=Count('id')
-    ).order_by('-visit_count')[:10]
+    report = get_monthly_report(year, month)
+    
+    # Visit records, one keyset page at a time
+    records = keyset_paginate(
+        Attendance.objects.for_local_days(
+            report['first_day'],
+            report['last_day']
+        ).select_related('user__profile'),
+        'check_in_time',
+        cursor=request.GET.get('cursor'),
+        per_page=RECORDS_PER_PAGE,
+    )
     
     context = {
         'year': year,
         'month': month,
-        'month_name': date(year, month, 1).strftime('%B'),
-        'total_unique_visitors': total_unique_visitors,
-        'total_visits': total_visits,
-        'avg_daily_visitors': round(avg_daily_visitors, 1),
-        'daily_breakdown': daily_breakdown,
-        'top_students': top_students,
-        'records': monthly_records,
+        'month_name': report['first_day'].strftime('%B'),
+        'total_unique_visitors': report['total_unique_visitors'],
+        'total_visits': report['total_visits'],
+        'avg_daily_visitors': report['avg_daily_visitors'],
+        'daily_breakdown': report['daily_breakdown'],
+        'top_students': report['top_students'],
+        'records': records,
+        'today': timezone.now(),
     }
     
     return render(request, 'monthly-report.html', context)
@@ -260,35 +189,22 @@ def monthly_report_view(request, year, month):
 
 @require_http_methods(["POST"])
 @login_required
+@role_required('librarian', response='json')
 def auto_checkout_view(request, record_id):
     """Force check-out for a specific attendance record (admin use)"""
-    user_profile = get_object_or_404(UserProfile, user=request.user)
-    
-    if not user_profile.is_librarian():
-        return JsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=403)
-    
     attendance = get_object_or_404(Attendance, id=record_id)
     
-    if attendance.status == 'checked_in':
-        attendance.check_out_time = timezone.now()
-        attendance.status = 'checked_out'
-        attendance.save()
+    if bulk_check_out(Attendance.objects.filter(pk=attendance.pk)):
+        attendance.refresh_from_db()
         return JsonResponse({'status': 'success', 'duration': attendance.duration_display})
     
     return JsonResponse({'status': 'error', 'message': 'Already checked out'})
 
 
 @login_required
+@student_required(message="Only students can view their attendance history.")
 def attendance_history_view(request):
     """Student's attendance history page"""
-    # Get user profile
-    user_profile = get_object_or_404(UserProfile, user=request.user)
-    
-    # Check if user is a student
-    if not user_profile.is_student():
-        messages.error(request, "Only students can view their attendance history.")
-        return redirect('main:mainpage')
-    
     # Get all attendance records for the student
     all_records = Attendance.objects.filter(
         user=request.user,
@@ -300,17 +216,14 @@ def attendance_history_view(request):
     year = request.GET.get('year')
     
     if month and year:
-        filtered_records = all_records.filter(
-            check_in_time__month=int(month),
-            check_in_time__year=int(year)
-        )
+        selected = date(int(year), int(month), 1)
     else:
         # Default to current month
-        today = timezone.now()
-        filtered_records = all_records.filter(
-            check_in_time__month=today.month,
-            check_in_time__year=today.year
-        )
+        selected = timezone.localdate().replace(day=1)
+    filtered_records = all_records.for_local_days(
+        selected,
+        selected.replace(day=monthrange(selected.year, selected.month)[1])
+    )
     
     # Calculate statistics
     total_visits = all_records.count()
@@ -320,19 +233,16 @@ def attendance_history_view(request):
     month_duration = filtered_records.aggregate(total=Avg('duration_minutes'))['total'] or 0
     
     # Get top activities
-    activity_counts = {}
-    for record in all_records:
-        for activity in record.activities.all():
-            activity_counts[activity.name] = activity_counts.get(activity.name, 0) + 1
-    
-    top_activities = sorted(
-        activity_counts.items(),
-        key=lambda x: x[1],
-        reverse=True
-    )[:5]
+    top_activities = list(
+        AttendanceActivity.objects.filter(
+            attendance_records__in=all_records
+        ).values_list('name').annotate(
+            count=Count('attendance_records')
+        ).order_by('-count', 'name')[:5]
+    )
     
     context = {
-        'user_profile': user_profile,
+        'user_profile': request.profile,
         'records': filtered_records,
         'total_visits': total_visits,
         'total_duration': int(total_duration),
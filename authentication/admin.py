@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
-from .models import UserProfile
+from .models import UserProfile, StudentImport
 
 
 class UserProfileInline(admin.StackedInline):
@@ -19,3 +19,10 @@ class UserAdmin(BaseUserAdmin):
 admin.site.unregister(User)
 admin.site.register(User, UserAdmin)
 admin.site.register(UserProfile)
+
+
+@admin.register(StudentImport)
+class StudentImportAdmin(admin.ModelAdmin):
+    list_display = ['source', 'status', 'created_count', 'updated_count', 'skipped_count', 'error_count', 'started_at', 'finished_at']
+    list_filter = ['status']
+    readonly_fields = ['checksum', 'last_row', 'started_at', 'finished_at']
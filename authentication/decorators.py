@@ -0,0 +1,44 @@
+"""
+Role checks for views, based on request.profile (see ProfileMiddleware)
+Use after @login_required. A denied request is redirected with an optional
+error message, or answered with a 403 when response='forbidden' or 'json'.
+"""
+from functools import wraps
+
+from django.contrib import messages
+from django.http import HttpResponseForbidden, JsonResponse
+from django.shortcuts import redirect
+
+
+def role_required(*roles, message=None, redirect_to='main:mainpage', response='redirect'):
+    """Only let users whose profile has one of `roles` through"""
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            profile = request.profile
+            if profile and profile.role in roles:
+                return view_func(request, *args, **kwargs)
+
+            if response == 'json':
+                return JsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=403)
+            if response == 'forbidden':
+                return HttpResponseForbidden(message or "You don't have permission to access this page.")
+            if message:
+                messages.error(request, message)
+            return redirect(redirect_to)
+        return _wrapped_view
+
+    return decorator
+
+
+def student_required(view_func=None, **options):
+    """@student_required, or @student_required(message=..., redirect_to=...)"""
+    decorator = role_required('student', **options)
+    return decorator(view_func) if view_func else decorator
+
+
+def staff_required(view_func=None, **options):
+    """Librarians and teachers; @staff_required or @staff_required(...)"""
+    decorator = role_required('librarian', 'teacher', **options)
+    return decorator(view_func) if view_func else decorator
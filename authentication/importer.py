@@ -0,0 +1,348 @@
+"""
+Student roster import
+Rows come from a streaming reader (see readers.py) and pass through a
+validation stage before they are written. Existing students are prefetched once, new users and profiles are written
+with bulk_create in chunked transactions, and returning students can have
+their kelas and gender updated (e.g. after class promotions). Initial
+password hashes are computed in a pool of worker processes.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import os
+
+import django
+from django.apps import apps
+from django.contrib.auth.hashers import make_password, PBKDF2PasswordHasher
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .models import UserProfile, StudentImport
+from .middleware import invalidate_profiles
+
+
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_HASH_CHUNK_SIZE = 16
+MAX_REPORTED_ERRORS = 100
+
+NIS_MAX_LENGTH = 20
+FIELD_MAX_LENGTHS = {'first_name': 150, 'last_name': 150, 'kelas': 50}
+GENDER_VALUES = {
+    '': '',
+    'l': 'L',
+    'laki-laki': 'L',
+    'p': 'P',
+    'perempuan': 'P',
+}
+
+
+class InitialPasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2 with far fewer iterations for --fast-initial-hash. The initial
+    password is the student's NIS, and Django re-hashes it with the full
+    iteration count the first time the student logs in.
+    """
+    iterations = 10_000
+
+
+def _init_worker():
+    # Worker processes started with "spawn" have not loaded the settings yet
+    if not apps.ready:
+        django.setup()
+
+
+def _hash_password(password, fast=False):
+    return make_password(password, hasher=InitialPasswordHasher() if fast else 'default')
+
+
+class PasswordHashPool:
+    """
+    Computes make_password() for batches of passwords across worker
+    processes. With a single worker the hashes are computed in-process.
+    """
+
+    def __init__(self, workers=None, chunk_size=DEFAULT_HASH_CHUNK_SIZE, fast=False):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.fast = fast
+        self.executor = None
+
+    def __enter__(self):
+        if self.workers > 1:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def hash(self, passwords):
+        if self.executor is None or len(passwords) <= self.chunk_size:
+            return [_hash_password(password, self.fast) for password in passwords]
+        return list(self.executor.map(
+            _hash_password,
+            passwords,
+            [self.fast] * len(passwords),
+            chunksize=self.chunk_size,
+        ))
+
+
+class ImportResult:
+    """Counts and per-row errors of one import run"""
+
+    def __init__(self, rejects=None):
+        self.created = 0
+        self.updated = 0
+        self.skipped = 0
+        self.error_count = 0
+        # The first MAX_REPORTED_ERRORS errors; all of them go to `rejects`
+        self.errors = []
+        self.rejects = rejects
+
+    def error(self, row_number, values, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((row_number, message))
+        if self.rejects is not None:
+            self.rejects.write(row_number, values, message)
+
+
+def parse_nis(value):
+    """Normalize a NIS cell, including float cells like 2514440.0"""
+    if isinstance(value, float):
+        return str(int(value))
+    nis = str(value).strip()
+    if nis.endswith('.0'):
+        nis = nis[:-2]
+    return nis
+
+
+def _text(value):
+    return str(value).strip() if value is not None else ''
+
+
+def clean_row(values):
+    """
+    Validate a (nis, nama, jenis_kelamin, kelas) row and return the student's
+    fields, None for a blank row, or raise ValueError describing the problem
+    """
+    if isinstance(values, Exception):
+        raise values
+    nis, nama, jenis_kelamin, kelas = (list(values) + [None] * 4)[:4]
+    nama = _text(nama)
+    if not nis and not nama:
+        return None
+    if not nis or not nama:
+        raise ValueError('Missing NIS or Nama')
+
+    nis = parse_nis(nis)
+    if not nis.isdigit() or len(nis) > NIS_MAX_LENGTH:
+        raise ValueError(f'Invalid NIS {nis!r}')
+
+    gender = GENDER_VALUES.get(_text(jenis_kelamin).lower())
+    if gender is None:
+        raise ValueError(f'Unknown Jenis Kelamin {jenis_kelamin!r}')
+
+    kelas = _text(kelas)
+    parts = nama.split(' ', 1)
+    student = {
+        'nis': nis,
+        'first_name': parts[0],
+        'last_name': parts[1] if len(parts) > 1 else '',
+        'gender': gender,
+        'kelas': kelas,
+    }
+    for field, max_length in FIELD_MAX_LENGTHS.items():
+        if len(student[field]) > max_length:
+            raise ValueError(f'{field} is longer than {max_length} characters')
+    return student
+
+
+def validate_rows(rows, result, start_after=0):
+    """
+    Pipeline stage between a reader and the writer: yields (row number,
+    student fields) for valid rows and (row number, None) for blank or
+    rejected rows, which are counted in `result`
+    """
+    for row_number, values in rows:
+        if row_number <= start_after:
+            continue
+        try:
+            student = clean_row(values)
+        except (TypeError, ValueError) as e:
+            result.error(row_number, values, str(e))
+            yield row_number, None
+            continue
+        if student is None:
+            result.skipped += 1
+        yield row_number, student
+
+
+def _create_students(students, passwords):
+    """Create users and student profiles for a chunk of cleaned rows and their password hashes"""
+    users = User.objects.bulk_create([
+        User(
+            username=student['nis'],
+            password=password,
+            first_name=student['first_name'],
+            last_name=student['last_name'],
+            email=f"{student['nis']}@student.local",
+        )
+        for student, password in zip(students, passwords)
+    ])
+    if users and users[0].pk is None:
+        # Backends that cannot return ids from a bulk insert
+        user_ids = dict(
+            User.objects.filter(username__in=[user.username for user in users]).values_list('username', 'id')
+        )
+        for user in users:
+            user.pk = user_ids[user.username]
+
+    UserProfile.objects.bulk_create([
+        UserProfile(
+            user=user,
+            role='student',
+            nis=student['nis'],
+            gender=student['gender'],
+            kelas=student['kelas'],
+        )
+        for user, student in zip(users, students)
+    ])
+
+
+def import_students(rows, update_existing=False, chunk_size=DEFAULT_CHUNK_SIZE, password_pool=None,
+                    start_after=0, on_chunk=None, rejects=None):
+    """
+    Import (row number, values) pairs from a reader and return an
+    ImportResult. Rows for existing usernames are skipped, unless
+    update_existing is set and the student's kelas or gender changed.
+    Passwords are hashed with `password_pool` (a PasswordHashPool), or
+    in-process if it is None. Invalid rows are written to `rejects`
+    (a RejectsWriter) if given.
+
+    Rows numbered up to `start_after` are ignored. `on_chunk(last_row, result)`
+    is called inside each chunk's transaction, so progress recorded there is
+    committed together with the chunk.
+    """
+    if password_pool is None:
+        password_pool = PasswordHashPool(workers=1)
+    result = ImportResult(rejects)
+    last_row = start_after
+
+    usernames = set(User.objects.values_list('username', flat=True))
+    profiles = {
+        nis: (pk, user_id, kelas or '', gender or '')
+        for pk, user_id, nis, kelas, gender in UserProfile.objects.filter(
+            role='student', nis__isnull=False
+        ).values_list('pk', 'user_id', 'nis', 'kelas', 'gender')
+    }
+
+    new_students = []
+    changed_profiles = []
+
+    def flush():
+        # Hash outside the transaction so it is not held open while workers run
+        passwords = password_pool.hash([student['nis'] for student in new_students])
+        with transaction.atomic():
+            if new_students:
+                _create_students(new_students, passwords)
+            if changed_profiles:
+                UserProfile.objects.bulk_update(changed_profiles, ['kelas', 'gender', 'updated_at'])
+                # bulk_update sends no post_save, so drop the cached profiles here
+                user_ids = [profile.user_id for profile in changed_profiles]
+                transaction.on_commit(lambda: invalidate_profiles(user_ids))
+            result.created += len(new_students)
+            result.updated += len(changed_profiles)
+            if on_chunk is not None:
+                on_chunk(last_row, result)
+        new_students.clear()
+        changed_profiles.clear()
+
+    for row_number, student in validate_rows(rows, result, start_after):
+        last_row = row_number
+        if student is None:
+            continue
+
+        nis = student['nis']
+        if nis in usernames or nis in profiles:
+            existing = profiles.get(nis)
+            if update_existing and existing and existing[2:] != (student['kelas'], student['gender']):
+                changed_profiles.append(
+                    UserProfile(
+                        pk=existing[0],
+                        user_id=existing[1],
+                        kelas=student['kelas'],
+                        gender=student['gender'],
+                        updated_at=timezone.now(),
+                    )
+                )
+                profiles[nis] = (*existing[:2], student['kelas'], student['gender'])
+            else:
+                result.skipped += 1
+        else:
+            usernames.add(nis)
+            new_students.append(student)
+
+        if len(new_students) + len(changed_profiles) >= chunk_size:
+            flush()
+
+    flush()
+    return result
+
+
+def file_checksum(filepath):
+    """SHA-256 hex digest of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as source:
+        for block in iter(lambda: source.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def run_import(filepath, rows, force=False, **options):
+    """
+    Import `rows` read from `filepath` as a StudentImport job and return it,
+    or return None if a file with the same checksum was already imported
+    (unless `force` is set). An interrupted job for the same file resumes
+    after its last committed row, keeping the rejects the earlier run wrote
+    for the committed rows. `options` are passed to import_students.
+    """
+    checksum = file_checksum(filepath)
+    if not force and StudentImport.objects.filter(checksum=checksum, status='completed').exists():
+        return None
+
+    job = StudentImport.objects.filter(
+        checksum=checksum, status__in=['running', 'failed']
+    ).order_by('-started_at').first()
+    if job is None:
+        job = StudentImport.objects.create(source=str(filepath), checksum=checksum)
+    else:
+        job.status = 'running'
+        job.save(update_fields=['status'])
+        if options.get('rejects') is not None:
+            options['rejects'].resume(job.last_row)
+
+    base = (job.created_count, job.updated_count, job.skipped_count, job.error_count)
+
+    def record_progress(last_row, result):
+        job.last_row = last_row
+        job.created_count = base[0] + result.created
+        job.updated_count = base[1] + result.updated
+        job.skipped_count = base[2] + result.skipped
+        job.error_count = base[3] + result.error_count
+        job.save(update_fields=[
+            'last_row', 'created_count', 'updated_count', 'skipped_count', 'error_count'
+        ])
+
+    try:
+        job.result = import_students(rows, start_after=job.last_row, on_chunk=record_progress, **options)
+    except Exception:
+        job.status = 'failed'
+        job.save(update_fields=['status'])
+        raise
+
+    job.status = 'completed'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'finished_at'])
+    return job
@@ -1,117 +1,119 @@
 from django.core.management.base import BaseCommand, CommandError
-from django.contrib.auth.models import User
-from authentication.models import UserProfile
-from openpyxl import load_workbook
 import os
+import time
+
+from authentication.importer import (
+    run_import, PasswordHashPool, DEFAULT_CHUNK_SIZE, DEFAULT_HASH_CHUNK_SIZE
+)
+from authentication.readers import get_reader, RejectsWriter, READERS
 
 
 class Command(BaseCommand):
-    help = 'Import students from Excel file (Daftar-Siswa-Cleaned.xlsx)'
+    help = 'Import students from a roster file (XLSX, CSV or JSON Lines), e.g. Daftar-Siswa-Cleaned.xlsx'
 
     def add_arguments(self, parser):
         parser.add_argument(
             '--filepath',
             type=str,
-            help='Path to Excel file',
+            help='Path to the roster file',
             default='static/files/Daftar-Siswa-Cleaned.xlsx'
         )
         parser.add_argument(
-            '--skip-existing',
+            '--format',
+            choices=list(READERS),
+            help='Roster format (default: from the file extension)'
+        )
+        parser.add_argument(
+            '--rejects',
+            type=str,
+            help='CSV file for rows that fail validation (default: <filepath>.rejects.csv)'
+        )
+        parser.add_argument(
+            '--update-existing',
+            action='store_true',
+            help='Update kelas and gender of existing students (e.g. after class promotions); by default they are skipped'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help='Number of students written per transaction'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Processes used to hash passwords (default: number of CPUs, 1 hashes in-process)'
+        )
+        parser.add_argument(
+            '--hash-chunk-size',
+            type=int,
+            default=DEFAULT_HASH_CHUNK_SIZE,
+            help='Passwords handed to a worker process at a time'
+        )
+        parser.add_argument(
+            '--fast-initial-hash',
+            action='store_true',
+            help='Hash initial passwords with fewer PBKDF2 iterations; they are upgraded at first login'
+        )
+        parser.add_argument(
+            '--force',
             action='store_true',
-            help='Skip existing users',
-            default=True
+            help='Import the file even if a file with the same checksum was already imported'
         )
 
     def handle(self, *args, **options):
         filepath = options['filepath']
-        skip_existing = options['skip_existing']
         
         # Check if file exists
         if not os.path.exists(filepath):
             raise CommandError(f'File not found: {filepath}')
         
+        for option in ['chunk_size', 'workers', 'hash_chunk_size']:
+            if options[option] is not None and options[option] < 1:
+                raise CommandError(f"--{option.replace('_', '-')} must be at least 1")
+        
+        try:
+            reader = get_reader(filepath, options['format'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        rejects_path = options['rejects'] or f'{filepath}.rejects.csv'
+        
+        started = time.perf_counter()
         try:
-            workbook = load_workbook(filepath)
-            worksheet = workbook.active
-            
-            imported_count = 0
-            skipped_count = 0
-            error_count = 0
-            
-            # Start from row 2 (skip header)
-            for row_idx, row in enumerate(worksheet.iter_rows(min_row=2, values_only=True), start=2):
-                try:
-                    nis, nama, jenis_kelamin, kelas = row[0], row[1], row[2], row[3]
-                    
-                    # Validate data
-                    if not nis or not nama:
-                        self.stdout.write(self.style.WARNING(f'Row {row_idx}: Missing NIS or Nama, skipping'))
-                        skipped_count += 1
-                        continue
-                    
-                    # Convert to string and strip whitespace
-                    # Handle float format (e.g., 2514440.0 -> 2514440)
-                    if isinstance(nis, float):
-                        nis = str(int(nis))
-                    else:
-                        nis = str(nis).strip()
-                        # Remove .0 suffix if present
-                        if nis.endswith('.0'):
-                            nis = nis[:-2]
-                    nama = str(nama).strip()
-                    jenis_kelamin = str(jenis_kelamin).strip() if jenis_kelamin else ''
-                    kelas = str(kelas).strip() if kelas else ''
-                    
-                    # Check if user already exists
-                    if User.objects.filter(username=nis).exists():
-                        if skip_existing:
-                            self.stdout.write(self.style.WARNING(f'Row {row_idx}: User {nis} already exists, skipping'))
-                            skipped_count += 1
-                            continue
-                        else:
-                            self.stdout.write(self.style.ERROR(f'Row {row_idx}: User {nis} already exists'))
-                            error_count += 1
-                            continue
-                    
-                    # Parse nama (split into first and last name)
-                    parts = nama.split(' ', 1)
-                    first_name = parts[0]
-                    last_name = parts[1] if len(parts) > 1 else ''
-                    
-                    # Create user
-                    user = User.objects.create_user(
-                        username=nis,
-                        password=nis,  # Default password is NIS
-                        first_name=first_name,
-                        last_name=last_name,
-                        email=f'{nis}@student.local'
-                    )
-                    
-                    # Create user profile
-                    UserProfile.objects.create(
-                        user=user,
-                        role='student',
-                        nis=nis,
-                        gender=jenis_kelamin,
-                        kelas=kelas
-                    )
-                    
-                    self.stdout.write(self.style.SUCCESS(f'Row {row_idx}: Successfully imported {nis} - {nama}'))
-                    imported_count += 1
-                    
-                except TypeError as e:
-                    self.stdout.write(self.style.ERROR(f'Row {row_idx}: Type error - {str(e)}'))
-                    error_count += 1
-                except Exception as e:
-                    self.stdout.write(self.style.ERROR(f'Row {row_idx}: Error - {str(e)}'))
-                    error_count += 1
-            
-            # Print summary
-            self.stdout.write(self.style.SUCCESS('\n========== SUMMARY =========='))
-            self.stdout.write(f'Imported: {imported_count}')
-            self.stdout.write(self.style.WARNING(f'Skipped: {skipped_count}'))
-            self.stdout.write(self.style.ERROR(f'Errors: {error_count}'))
-            self.stdout.write('=============================')
-            
+            with PasswordHashPool(
+                workers=options['workers'],
+                chunk_size=options['hash_chunk_size'],
+                fast=options['fast_initial_hash'],
+            ) as password_pool, RejectsWriter(rejects_path) as rejects:
+                job = run_import(
+                    filepath,
+                    reader(filepath),
+                    force=options['force'],
+                    update_existing=options['update_existing'],
+                    chunk_size=options['chunk_size'],
+                    password_pool=password_pool,
+                    rejects=rejects,
+                )
         except Exception as e:
-            raise CommandError(f'Error reading Excel file: {str(e)}')
+            raise CommandError(f'Error reading roster file: {str(e)}')
+        
+        if job is None:
+            self.stdout.write(self.style.WARNING(
+                f'{filepath} is unchanged since it was last imported, skipping (use --force to re-import)'
+            ))
+            return
+        
+        for row_number, message in job.result.errors:
+            self.stdout.write(self.style.ERROR(f'Row {row_number}: {message}'))
+        if rejects.count:
+            self.stdout.write(self.style.WARNING(f'{rejects.count} rejected rows written to {rejects_path}'))
+        
+        # Print summary
+        self.stdout.write(self.style.SUCCESS('\n========== SUMMARY =========='))
+        self.stdout.write(f'Imported: {job.created_count}')
+        self.stdout.write(f'Updated: {job.updated_count}')
+        self.stdout.write(self.style.WARNING(f'Skipped: {job.skipped_count}'))
+        self.stdout.write(self.style.ERROR(f'Errors: {job.error_count}'))
+        self.stdout.write(f'Time: {time.perf_counter() - started:.2f}s')
+        self.stdout.write('=============================')
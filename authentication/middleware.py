@@ -0,0 +1,59 @@
+"""
+Per-request user profile
+ProfileMiddleware gives every request a lazy `request.profile`: the
+authenticated user's UserProfile (or None), loaded at most once per request
+and cached for a short time across requests. Must come after
+AuthenticationMiddleware.
+"""
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
+from .models import UserProfile
+
+
+PROFILE_CACHE_TIMEOUT = 60
+
+# Cached for users without a profile, so they do not query on every request
+_NO_PROFILE = 'none'
+
+
+def _cache_key(user_id):
+    return f'authentication:profile:{user_id}'
+
+
+def get_profile(user):
+    """The user's profile, attached to `user` so user.profile needs no query, or None"""
+    if not user.is_authenticated:
+        return None
+
+    key = _cache_key(user.pk)
+    profile = cache.get(key)
+    if profile is None:
+        profile = UserProfile.objects.filter(user_id=user.pk).first()
+        cache.set(key, profile or _NO_PROFILE, PROFILE_CACHE_TIMEOUT)
+    elif profile == _NO_PROFILE:
+        profile = None
+
+    if profile is not None:
+        # Reuse the session user instead of a join; this also fills user.profile
+        profile.user = user
+    return profile
+
+
+def invalidate_profile(sender, instance, **kwargs):
+    cache.delete(_cache_key(instance.user_id))
+
+
+def invalidate_profiles(user_ids):
+    """Drop the cached profiles of several users, e.g. after a bulk_update"""
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
+
+
+class ProfileMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.profile = SimpleLazyObject(lambda: get_profile(request.user))
+        return self.get_response(request)
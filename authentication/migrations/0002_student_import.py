@@ -0,0 +1,35 @@
+# Generated by Django 6.0.2 on 2026-10-17 17:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=255)),
+                ('checksum', models.CharField(help_text='SHA-256 of the source file', max_length=64)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='running', max_length=20)),
+                ('last_row', models.IntegerField(default=0, help_text='Last source row written')),
+                ('created_count', models.IntegerField(default=0)),
+                ('updated_count', models.IntegerField(default=0)),
+                ('skipped_count', models.IntegerField(default=0)),
+                ('error_count', models.IntegerField(default=0)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Student Import',
+                'verbose_name_plural': 'Student Imports',
+                'ordering': ['-started_at'],
+                'indexes': [models.Index(fields=['checksum', 'status'], name='authenticat_checksu_17afdc_idx')],
+            },
+        ),
+    ]
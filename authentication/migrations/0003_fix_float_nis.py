@@ -0,0 +1,50 @@
+# Generated by Django 6.0.2 on 2026-10-17 18:40
+
+from django.contrib.auth.hashers import make_password, PBKDF2PasswordHasher
+from django.db import migrations
+
+
+class InitialPasswordHasher(PBKDF2PasswordHasher):
+    # Upgraded to the default iteration count at the student's first login
+    iterations = 10_000
+
+
+def fix_float_nis(apps, schema_editor):
+    """Rename students imported with a float NIS (e.g. 2514440.0) and reset their password to the NIS"""
+    User = apps.get_model('auth', 'User')
+    UserProfile = apps.get_model('authentication', 'UserProfile')
+
+    renames = {
+        pk: username[:-2]
+        for pk, username in User.objects.filter(username__endswith='.0').values_list('pk', 'username')
+    }
+    if not renames:
+        return
+
+    taken = set(User.objects.filter(username__in=renames.values()).values_list('username', flat=True))
+    taken |= set(UserProfile.objects.filter(nis__in=renames.values()).values_list('nis', flat=True))
+    renames = {pk: nis for pk, nis in renames.items() if nis not in taken}
+
+    hasher = InitialPasswordHasher()
+    users = list(User.objects.filter(pk__in=renames).only('pk'))
+    for user in users:
+        user.username = renames[user.pk]
+        user.password = make_password(user.username, hasher=hasher)
+    User.objects.bulk_update(users, ['username', 'password'], batch_size=500)
+
+    profiles = list(UserProfile.objects.filter(user_id__in=renames).only('pk', 'user_id'))
+    for profile in profiles:
+        profile.nis = renames[profile.user_id]
+    UserProfile.objects.bulk_update(profiles, ['nis'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0002_student_import'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(fix_float_nis, migrations.RunPython.noop),
+    ]
@@ -42,3 +42,38 @@ class UserProfile(models.Model):
     
     def is_librarian(self):
         return self.role == 'librarian'
+
+
+class StudentImport(models.Model):
+    """A run of the student roster import, keyed by the checksum of the source file"""
+    
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    source = models.CharField(max_length=255)
+    checksum = models.CharField(max_length=64, help_text="SHA-256 of the source file")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running')
+    
+    # Progress, committed together with each chunk so an interrupted run can resume
+    last_row = models.IntegerField(default=0, help_text="Last source row written")
+    created_count = models.IntegerField(default=0)
+    updated_count = models.IntegerField(default=0)
+    skipped_count = models.IntegerField(default=0)
+    error_count = models.IntegerField(default=0)
+    
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['checksum', 'status']),
+        ]
+        verbose_name = "Student Import"
+        verbose_name_plural = "Student Imports"
+    
+    def __str__(self):
+        return f"{self.source} ({self.get_status_display()})"
@@ -0,0 +1,158 @@
+"""
+Streaming roster readers for the student import
+Each reader yields (row number, (nis, nama, jenis_kelamin, kelas)) pairs one
+row at a time, so memory use does not grow with the roster. A row the reader
+cannot parse is yielded as a ValueError in place of the values and rejected
+by the validation stage.
+"""
+import csv
+import json
+import os
+
+from openpyxl import load_workbook
+
+
+COLUMNS = ['nis', 'nama', 'jenis_kelamin', 'kelas']
+
+# Header spellings accepted for each column
+COLUMN_ALIASES = {
+    'nis': 'nis',
+    'nama': 'nama',
+    'name': 'nama',
+    'jenis kelamin': 'jenis_kelamin',
+    'jenis_kelamin': 'jenis_kelamin',
+    'gender': 'jenis_kelamin',
+    'kelas': 'kelas',
+    'class': 'kelas',
+}
+
+
+def _column_positions(header):
+    """Map each known column to its index in the header, or None if the header has none of them"""
+    positions = {}
+    for index, name in enumerate(header):
+        column = COLUMN_ALIASES.get(str(name or '').strip().lower())
+        if column and column not in positions:
+            positions[column] = index
+    return positions or None
+
+
+def _pick(row, positions):
+    """The row's values in COLUMNS order, by header position or else by position"""
+    if positions is None:
+        return tuple((list(row) + [None] * len(COLUMNS))[:len(COLUMNS)])
+    values = []
+    for column in COLUMNS:
+        index = positions.get(column)
+        values.append(row[index] if index is not None and index < len(row) else None)
+    return tuple(values)
+
+
+def read_xlsx(filepath):
+    """Rows of the first sheet, read with openpyxl's streaming read-only mode"""
+    workbook = load_workbook(filepath, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        positions = _column_positions(next(rows, ()))
+        for row_number, row in enumerate(rows, start=2):
+            yield row_number, _pick(row, positions)
+    finally:
+        workbook.close()
+
+
+def read_csv(filepath):
+    with open(filepath, newline='', encoding='utf-8-sig') as source:
+        rows = csv.reader(source)
+        positions = _column_positions(next(rows, []))
+        for row_number, row in enumerate(rows, start=2):
+            yield row_number, _pick([value or None for value in row], positions)
+
+
+def read_jsonl(filepath):
+    """One JSON object per line, keyed by the column names or their aliases"""
+    with open(filepath, encoding='utf-8') as source:
+        for row_number, line in enumerate(source, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError('expected a JSON object')
+            except ValueError as e:
+                yield row_number, ValueError(f'Invalid JSON: {e}')
+                continue
+            values = {}
+            for key, value in record.items():
+                column = COLUMN_ALIASES.get(str(key).strip().lower())
+                if column:
+                    values.setdefault(column, value)
+            yield row_number, tuple(values.get(column) for column in COLUMNS)
+
+
+READERS = {
+    'xlsx': read_xlsx,
+    'csv': read_csv,
+    'jsonl': read_jsonl,
+}
+
+
+def get_reader(filepath, file_format=None):
+    """Return the reader for `file_format`, or for the file's extension"""
+    file_format = (file_format or os.path.splitext(filepath)[1].lstrip('.')).lower()
+    if file_format == 'json':
+        file_format = 'jsonl'
+    try:
+        return READERS[file_format]
+    except KeyError:
+        raise ValueError(
+            f"Unsupported roster format '{file_format}' (expected one of: {', '.join(READERS)})"
+        )
+
+
+class RejectsWriter:
+    """
+    Writes rejected rows to a CSV file, created on the first reject. A resumed
+    import calls resume() first to keep the rejects of its earlier runs.
+    """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.count = 0
+        self._file = None
+        self._writer = None
+
+    def _open(self):
+        self._file = open(self.filepath, 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(['row', 'reason'] + COLUMNS)
+
+    def resume(self, start_after):
+        """
+        Keep the rejects already written for rows up to `start_after`; later
+        ones were never committed and are read (and rejected) again
+        """
+        try:
+            with open(self.filepath, newline='', encoding='utf-8') as existing:
+                kept = [row for row in list(csv.reader(existing))[1:] if row and int(row[0]) <= start_after]
+        except (FileNotFoundError, ValueError):
+            kept = []
+        if kept:
+            self._open()
+            self._writer.writerows(kept)
+
+    def write(self, row_number, values, reason):
+        if self._writer is None:
+            self._open()
+        raw = list(values) if isinstance(values, tuple) else [''] * len(COLUMNS)
+        self._writer.writerow([row_number, reason] + ['' if value is None else value for value in raw])
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,3 +1,228 @@
 from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.cache import cache
+from django.urls import reverse
+from io import StringIO
+import csv
+import json
+import os
+import tempfile
 
-# Create your tests here.
+from openpyxl import Workbook
+
+from .models import UserProfile, StudentImport
+from .importer import import_students, run_import, PasswordHashPool, InitialPasswordHasher
+from .readers import read_xlsx, RejectsWriter
+from .middleware import get_profile
+
+
+ROSTER = [
+    (2514440.0, 'Budi Santoso', 'L', 'X 1'),
+    ('2514441', 'Siti', 'P', 'X 2'),
+    (None, 'Tanpa NIS', 'L', 'X 1'),
+    ('2514441', 'Siti Duplikat', 'P', 'X 2'),
+]
+
+
+def rows(roster):
+    return enumerate(roster, start=2)
+
+
+class StudentImportTests(TestCase):
+
+    def test_creates_users_and_profiles_in_bulk(self):
+        with self.assertNumQueries(6):
+            # Two prefetch queries, then one transaction with both bulk inserts
+            result = import_students(rows(ROSTER))
+
+        self.assertEqual(
+            (result.created, result.updated, result.skipped, result.errors),
+            (2, 0, 1, [(4, 'Missing NIS or Nama')])
+        )
+        budi = User.objects.get(username='2514440')
+        self.assertEqual((budi.first_name, budi.last_name, budi.profile.kelas), ('Budi', 'Santoso', 'X 1'))
+        self.assertTrue(budi.check_password('2514440'))
+
+    def test_reimport_skips_or_promotes(self):
+        cache.clear()
+        import_students(rows(ROSTER))
+        promoted = [('2514440', 'Budi Santoso', 'L', 'XI 1'), ('2514441', 'Siti', 'P', 'X 2')]
+
+        result = import_students(rows(promoted))
+        self.assertEqual((result.created, result.updated, result.skipped), (0, 0, 2))
+
+        budi = User.objects.get(username='2514440')
+        self.assertEqual(get_profile(budi).kelas, 'X 1')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = import_students(rows(promoted), update_existing=True)
+        self.assertEqual((result.created, result.updated, result.skipped), (0, 1, 1))
+        self.assertEqual(UserProfile.objects.get(nis='2514440').kelas, 'XI 1')
+        # The profile cached by the middleware is dropped too
+        self.assertEqual(get_profile(budi).kelas, 'XI 1')
+
+    def test_parallel_and_fast_initial_hashes(self):
+        roster = [(f'25150{i:02d}', f'Siswa {i}', 'L', 'X 3') for i in range(6)]
+        with PasswordHashPool(workers=2, chunk_size=2, fast=True) as password_pool:
+            result = import_students(rows(roster), password_pool=password_pool)
+        self.assertEqual(result.created, 6)
+
+        student = User.objects.get(username='2515003')
+        self.assertIn(f'${InitialPasswordHasher.iterations}$', student.password)
+        # Checking the password upgrades it to the default hasher's iteration count
+        self.assertTrue(student.check_password('2515003'))
+        student.refresh_from_db()
+        self.assertNotIn(f'${InitialPasswordHasher.iterations}$', student.password)
+        self.assertTrue(student.check_password('2515003'))
+
+    def write_roster(self, roster):
+        workbook = Workbook()
+        workbook.active.append(['NIS', 'Nama', 'Jenis Kelamin', 'Kelas'])
+        for row in roster:
+            workbook.active.append(row)
+        handle, filepath = tempfile.mkstemp(suffix='.xlsx')
+        os.close(handle)
+        self.addCleanup(os.remove, filepath)
+        workbook.save(filepath)
+        return filepath
+
+    def test_command_streams_workbook_and_skips_unchanged_files(self):
+        filepath = self.write_roster(ROSTER)
+        self.assertEqual([number for number, _ in read_xlsx(filepath)], [2, 3, 4, 5])
+
+        out = StringIO()
+        call_command('import_students', filepath=filepath, chunk_size=1, workers=1, stdout=out)
+        self.assertIn('Imported: 2', out.getvalue())
+        self.assertEqual(UserProfile.objects.filter(role='student').count(), 2)
+
+        out = StringIO()
+        with self.assertNumQueries(1):
+            call_command('import_students', filepath=filepath, workers=1, stdout=out)
+        self.assertIn('unchanged', out.getvalue())
+
+    def test_interrupted_import_resumes(self):
+        filepath = self.write_roster(ROSTER)
+
+        def failing_rows():
+            yield from list(read_xlsx(filepath))[:2]
+            raise OSError('disk went away')
+
+        with self.assertRaises(OSError):
+            run_import(filepath, failing_rows(), chunk_size=1)
+        job = StudentImport.objects.get()
+        self.assertEqual((job.status, job.last_row, job.created_count), ('failed', 3, 2))
+
+        job = run_import(filepath, read_xlsx(filepath), chunk_size=1)
+        self.assertEqual(job.result.created, 0)
+        self.assertEqual(
+            (job.status, job.last_row, job.created_count, job.skipped_count, job.error_count),
+            ('completed', 5, 2, 1, 1)
+        )
+        self.assertEqual(StudentImport.objects.count(), 1)
+
+    def test_resumed_import_keeps_earlier_rejects(self):
+        filepath = self.write_roster([
+            ('2514450', 'Andi', 'L', 'X 1'),
+            (None, 'Tanpa NIS', 'L', 'X 1'),
+            ('2514451', 'Bima', 'L', 'X 1'),
+            ('2514452', 'Cinta', 'P', 'X 2'),
+            ('2514453', 'Dina', 'Q', 'X 2'),
+        ])
+        handle, rejects_path = tempfile.mkstemp(suffix='.csv')
+        os.close(handle)
+        self.addCleanup(os.remove, rejects_path)
+
+        def failing_rows():
+            yield from read_xlsx(filepath)
+            raise OSError('disk went away')
+
+        # Rows 3 and 6 are rejected; the chunks up to row 5 get committed
+        with self.assertRaises(OSError), RejectsWriter(rejects_path) as rejects:
+            run_import(filepath, failing_rows(), chunk_size=1, rejects=rejects)
+        self.assertEqual(StudentImport.objects.get().last_row, 5)
+
+        with RejectsWriter(rejects_path) as rejects:
+            run_import(filepath, read_xlsx(filepath), chunk_size=1, rejects=rejects)
+        self.assertEqual(rejects.count, 1)
+
+        with open(rejects_path, newline='') as rejected:
+            self.assertEqual([row[0] for row in csv.reader(rejected)], ['row', '3', '6'])
+
+
+class RosterReaderTests(TestCase):
+
+    def temp_path(self, suffix):
+        handle, filepath = tempfile.mkstemp(suffix=suffix)
+        os.close(handle)
+        self.addCleanup(os.remove, filepath)
+        return filepath
+
+    def test_csv_and_jsonl_with_rejects_file(self):
+        csv_path = self.temp_path('.csv')
+        with open(csv_path, 'w', newline='') as roster:
+            writer = csv.writer(roster)
+            writer.writerow(['Kelas', 'NIS', 'Nama', 'Jenis Kelamin'])
+            writer.writerow(['X 1', '2516001', 'Andi Wijaya', 'Laki-laki'])
+            writer.writerow(['X 1', '25A6002', 'Bad Nis', 'L'])
+            writer.writerow(['X 2', '2516003', 'Citra', 'X'])
+
+        jsonl_path = self.temp_path('.jsonl')
+        with open(jsonl_path, 'w') as roster:
+            roster.write(json.dumps({'nis': 2516004, 'nama': 'Dewi Lestari', 'gender': 'P', 'kelas': 'XI 1'}) + '\n')
+            roster.write('{not json\n')
+
+        rejects_path = self.temp_path('.csv')
+        for filepath in [csv_path, jsonl_path]:
+            call_command('import_students', filepath=filepath, rejects=rejects_path, workers=1, stdout=StringIO())
+            with open(rejects_path, newline='') as rejects:
+                rejected = [row[:2] for row in csv.reader(rejects)][1:]
+            if filepath == csv_path:
+                self.assertEqual(rejected, [['3', "Invalid NIS '25A6002'"], ['4', "Unknown Jenis Kelamin 'X'"]])
+            else:
+                self.assertEqual(rejected[0][0], '2')
+
+        self.assertEqual(
+            list(UserProfile.objects.order_by('nis').values_list('nis', 'gender', 'kelas')),
+            [('2516001', 'L', 'X 1'), ('2516004', 'P', 'XI 1')]
+        )
+
+    def test_unknown_format(self):
+        filepath = self.temp_path('.txt')
+        with self.assertRaisesMessage(CommandError, "Unsupported roster format 'txt'"):
+            call_command('import_students', filepath=filepath, stdout=StringIO())
+
+
+class ProfileMiddlewareTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.student = User.objects.create_user('2514440', password='secret')
+        UserProfile.objects.create(user=self.student, role='student', kelas='X 1')
+        self.librarian = User.objects.create_user('pustakawan', password='secret')
+        UserProfile.objects.create(user=self.librarian, role='librarian')
+
+    def test_profile_is_cached_and_invalidated(self):
+        profile = get_profile(self.student)
+        with self.assertNumQueries(0):
+            cached = get_profile(self.student)
+            self.assertEqual(cached.kelas, 'X 1')
+            self.assertIs(self.student.profile, cached)
+
+        profile.kelas = 'XI 1'
+        profile.save()
+        self.assertEqual(get_profile(self.student).kelas, 'XI 1')
+
+    def test_role_decorators(self):
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('attendance:dashboard'))
+        self.assertRedirects(response, reverse('main:mainpage'), fetch_redirect_response=False)
+        response = self.client.get(reverse('attendance:dashboard_stats'))
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json()['message'], 'Unauthorized')
+
+        self.client.force_login(self.librarian)
+        self.assertEqual(self.client.get(reverse('attendance:dashboard_stats')).status_code, 200)
+        response = self.client.get(reverse('attendance:history'))
+        self.assertRedirects(response, reverse('main:mainpage'), fetch_redirect_response=False)
@@ -1,3 +1,23 @@
 from django.contrib import admin
+from django.db.models import Count
+from .models import Book
+from .catalogue import book_keys
 
-# Register your models here.
+
+@admin.register(Book)
+class BookAdmin(admin.ModelAdmin):
+    list_display = ['title', 'author', 'publisher', 'year_published', 'review_count']
+    search_fields = ['title_key', 'author_key']
+    readonly_fields = ['title_key', 'author_key', 'created_at']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(review_count=Count('reviews'))
+    
+    def review_count(self, obj):
+        return obj.review_count
+    review_count.short_description = "Reviews"
+    review_count.admin_order_field = 'review_count'
+    
+    def save_model(self, request, obj, form, change):
+        obj.title_key, obj.author_key = book_keys(obj.title, obj.author)
+        super().save_model(request, obj, form, change)
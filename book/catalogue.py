@@ -0,0 +1,89 @@
+"""
+Book catalogue lookups
+Free-text titles and authors are matched on normalized keys, so spelling
+variants like 'Laskar  Pelangi' and 'laskar pelangi!' resolve to one Book.
+"""
+import re
+import unicodedata
+
+from django.db.models import Count, Q
+
+from .models import Book
+
+
+def normalize_key(text):
+    """Lowercase, strip accents and punctuation, and collapse whitespace"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(re.sub(r'[\W_]+', ' ', text.lower()).split())[:255]
+
+
+def book_keys(title, author):
+    return normalize_key(title), normalize_key(author)
+
+
+def resolve_books(details):
+    """
+    Map {(title_key, author_key): {'title', 'author', 'publisher', 'year_published'}}
+    to a {(title_key, author_key): book_id} dict, creating the missing books
+    with a fixed number of queries
+    """
+    if not details:
+        return {}
+
+    def lookup():
+        books = Book.objects.filter(title_key__in={title_key for title_key, _ in details})
+        return {
+            (title_key, author_key): pk
+            for pk, title_key, author_key in books.values_list('pk', 'title_key', 'author_key')
+            if (title_key, author_key) in details
+        }
+
+    found = lookup()
+    missing = [
+        Book(title_key=title_key, author_key=author_key, **details[(title_key, author_key)])
+        for title_key, author_key in details
+        if (title_key, author_key) not in found
+    ]
+    if missing:
+        # Concurrent writers may create the same books, so re-read afterwards
+        Book.objects.bulk_create(missing, batch_size=500, ignore_conflicts=True)
+        found = lookup()
+    return found
+
+
+def book_for(title, author, publisher='', year_published=None):
+    """Return the id of the catalogue entry for a title and author, creating it if needed"""
+    keys = book_keys(title, author)
+    if not all(keys):
+        return None
+    return resolve_books({
+        keys: {
+            'title': title.strip(),
+            'author': author.strip(),
+            'publisher': (publisher or '').strip(),
+            'year_published': year_published,
+        }
+    }).get(keys)
+
+
+def autocomplete(text, limit=10):
+    """
+    Books whose title or author starts with `text`, most reviewed first,
+    followed by books containing it when there are fewer than `limit`
+    """
+    key = normalize_key(text)
+    if not key:
+        return []
+
+    # Keys are already lowercase, so a case-sensitive prefix match is enough.
+    # Unlike a key range, it does not depend on the column's collation
+    prefix = Q(title_key__startswith=key) | Q(author_key__startswith=key)
+    books = Book.objects.annotate(review_count=Count('reviews'))
+    results = list(books.filter(prefix).order_by('-review_count', 'title')[:limit])
+
+    if len(results) < limit:
+        results += books.filter(
+            Q(title_key__contains=key) | Q(author_key__contains=key)
+        ).exclude(pk__in=[book.pk for book in results]).order_by('-review_count', 'title')[:limit - len(results)]
+    return results
@@ -0,0 +1,51 @@
+# Generated by Django 6.0.2 on 2026-10-17 17:29
+
+from django.db import migrations, models
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # Substring autocomplete on PostgreSQL; the prefix lookups use the btree indexes
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for column in ('title_key', 'author_key'):
+            schema_editor.execute(
+                f'CREATE INDEX book_book_{column}_trgm ON book_book USING GIN ({column} gin_trgm_ops)'
+            )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for column in ('title_key', 'author_key'):
+            schema_editor.execute(f'DROP INDEX IF EXISTS book_book_{column}_trgm')
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Book',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=255)),
+                ('author', models.CharField(max_length=255)),
+                ('publisher', models.CharField(blank=True, max_length=255)),
+                ('year_published', models.IntegerField(blank=True, null=True)),
+                ('title_key', models.CharField(max_length=255)),
+                ('author_key', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Book',
+                'verbose_name_plural': 'Books',
+                'ordering': ['title'],
+                'indexes': [models.Index(fields=['author_key'], name='book_book_author__072b00_idx')],
+                'constraints': [models.UniqueConstraint(fields=('title_key', 'author_key'), name='unique_book_keys')],
+            },
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0.2 on 2026-10-17 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='book',
+            name='book_book_author__072b00_idx',
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['title_key'], name='book_title_key_like_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['author_key'], name='book_author_key_like_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
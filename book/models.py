@@ -1,3 +1,33 @@
 from django.db import models
 
-# Create your models here.
+
+class Book(models.Model):
+    """A catalogue entry shared by every review of the same book"""
+    
+    title = models.CharField(max_length=255)
+    author = models.CharField(max_length=255)
+    publisher = models.CharField(max_length=255, blank=True)
+    year_published = models.IntegerField(null=True, blank=True)
+    
+    # Normalized forms used to match free-text titles and authors
+    title_key = models.CharField(max_length=255)
+    author_key = models.CharField(max_length=255)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['title']
+        constraints = [
+            models.UniqueConstraint(fields=['title_key', 'author_key'], name='unique_book_keys'),
+        ]
+        # Serve the prefix (LIKE 'key%') lookups of autocomplete; the opclasses
+        # make PostgreSQL use them under any collation, other backends ignore them
+        indexes = [
+            models.Index(fields=['title_key'], opclasses=['varchar_pattern_ops'], name='book_title_key_like_idx'),
+            models.Index(fields=['author_key'], opclasses=['varchar_pattern_ops'], name='book_author_key_like_idx'),
+        ]
+        verbose_name = "Book"
+        verbose_name_plural = "Books"
+    
+    def __str__(self):
+        return f"{self.title} - {self.author}"
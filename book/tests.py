@@ -1,3 +1,42 @@
 from django.test import TestCase
+from django.contrib.auth.models import User
+from django.urls import reverse
 
-# Create your tests here.
+from .models import Book
+from .catalogue import normalize_key, book_for, autocomplete
+
+
+class CatalogueTests(TestCase):
+
+    def test_spelling_variants_share_a_book(self):
+        self.assertEqual(normalize_key('  Laskar  Pelangi! '), 'laskar pelangi')
+        self.assertEqual(normalize_key('Pramoedya Ananta Töer'), 'pramoedya ananta toer')
+
+        first = book_for('Laskar Pelangi', 'Andrea Hirata', 'Bentang Pustaka', 2005)
+        self.assertEqual(book_for('laskar pelangi.', 'ANDREA HIRATA'), first)
+        self.assertNotEqual(book_for('Laskar Pelangi', 'Someone Else'), first)
+        self.assertIsNone(book_for('', 'Andrea Hirata'))
+        self.assertEqual(Book.objects.get(pk=first).publisher, 'Bentang Pustaka')
+
+    def test_autocomplete_prefix_then_substring(self):
+        book_for('Bumi Manusia', 'Pramoedya Ananta Toer')
+        book_for('Bumi', 'Tere Liye')
+        book_for('Anak Semua Bangsa', 'Pramoedya Ananta Toer')
+        book_for('Laskar Pelangi', 'Andrea Hirata')
+
+        self.assertEqual([book.title for book in autocomplete('bumi')], ['Bumi', 'Bumi Manusia'])
+        self.assertEqual(
+            [book.title for book in autocomplete('pramoedya')],
+            ['Anak Semua Bangsa', 'Bumi Manusia']
+        )
+        self.assertEqual([book.title for book in autocomplete('pelangi')], ['Laskar Pelangi'])
+        self.assertEqual(autocomplete('  '), [])
+
+    def test_autocomplete_endpoint(self):
+        book_for('Negeri 5 Menara', 'Ahmad Fuadi')
+        self.client.force_login(User.objects.create_user(username='reader'))
+
+        response = self.client.get(reverse('book:autocomplete'), {'q': 'negeri'})
+
+        self.assertEqual(response.json()['results'][0]['title'], 'Negeri 5 Menara')
+        self.assertEqual(response.json()['results'][0]['review_count'], 0)
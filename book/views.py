@@ -1,3 +1,30 @@
-from django.shortcuts import render
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods
 
-# Create your views here.
+from .catalogue import autocomplete
+
+
+AUTOCOMPLETE_LIMIT = 10
+
+
+@login_required
+@require_http_methods(["GET"])
+def autocomplete_view(request):
+    """Suggest catalogue books for a partially typed title or author"""
+    books = autocomplete(request.GET.get('q', ''), limit=AUTOCOMPLETE_LIMIT)
+    
+    return JsonResponse({
+        'status': 'success',
+        'results': [
+            {
+                'id': book.pk,
+                'title': book.title,
+                'author': book.author,
+                'publisher': book.publisher,
+                'year_published': book.year_published,
+                'review_count': book.review_count,
+            }
+            for book in books
+        ],
+    })
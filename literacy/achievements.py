@@ -0,0 +1,92 @@
+"""
+Achievement awarding
+Each rule is a set-based query returning the ids of the students who have
+earned one achievement type. award_achievements evaluates every rule, either
+for all students (the nightly job) or for a single student (after one of
+their reviews is verified), and inserts the new LiteracyAchievement rows with
+bulk_create(ignore_conflicts=True) against the (student, achievement_type)
+unique constraint. The 'ambassador' achievement is awarded by ambassadors.py.
+"""
+from datetime import timedelta
+import time
+
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+
+from .models import BookReview, LiteracyAchievement
+
+
+CONSISTENT_READER_WEEKS = 4
+
+
+def _verified_at_least(count):
+    def rule(reviews):
+        return reviews.filter(status='verified').values('student').annotate(
+            verified=Count('id')
+        ).filter(verified__gte=count).values_list('student', flat=True)
+    return rule
+
+
+def _consistent_reader(reviews):
+    """
+    A verified review submitted in each of CONSISTENT_READER_WEEKS different
+    weeks of the last ones
+    """
+    since = timezone.now() - timedelta(weeks=CONSISTENT_READER_WEEKS)
+    return reviews.filter(status='verified', created_at__gte=since).values('student').annotate(
+        weeks=Count(TruncWeek('created_at'), distinct=True)
+    ).filter(weeks__gte=CONSISTENT_READER_WEEKS).values_list('student', flat=True)
+
+
+# achievement_type -> rule(reviews queryset) returning qualifying student ids
+RULES = {
+    'first_review': _verified_at_least(1),
+    'five_books': _verified_at_least(5),
+    'ten_books': _verified_at_least(10),
+    'consistent_reader': _consistent_reader,
+}
+
+
+def award_achievements(student_id=None, rules=None):
+    """
+    Evaluate `rules` (by default all of RULES) for every student, or only for
+    `student_id`, award the achievements earned, and return
+    {achievement_type: {'awarded': count, 'seconds': elapsed}}, counting only
+    students who did not have the achievement yet
+    """
+    report = {}
+    for achievement_type in rules or RULES:
+        started = time.perf_counter()
+
+        reviews = BookReview.objects.order_by()
+        if student_id is not None:
+            reviews = reviews.filter(student_id=student_id)
+        # Students who already have it are excluded in the rule's query, so
+        # the ids left are exactly the missing (student, achievement_type)
+        # pairs; ignore_conflicts only covers a concurrent run inserting the
+        # same pair first
+        reviews = reviews.exclude(Exists(
+            LiteracyAchievement.objects.filter(student=OuterRef('student'), achievement_type=achievement_type)
+        ))
+        new_earners = list(RULES[achievement_type](reviews))
+
+        LiteracyAchievement.objects.bulk_create(
+            [
+                LiteracyAchievement(student_id=earner_id, achievement_type=achievement_type)
+                for earner_id in new_earners
+            ],
+            ignore_conflicts=True,
+        )
+        report[achievement_type] = {
+            'awarded': len(new_earners),
+            'seconds': time.perf_counter() - started,
+        }
+    return report
+
+
+def award_on_verification(sender, review, previous_status, **kwargs):
+    if previous_status != 'verified':
+        student_id = review.student_id
+        transaction.on_commit(lambda: award_achievements(student_id))
@@ -0,0 +1,115 @@
+"""
+Monthly literacy ambassadors
+select_monthly_ambassadors runs once a month (see CRONJOBS) and picks the top
+scorer of every class and grade for the month with a single windowed query.
+The winners are stored in MonthlyAmbassador, flagged on their leaderboard
+rows and awarded the 'ambassador' achievement, all with bulk writes.
+"""
+from datetime import date, datetime, time
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Value, Window
+from django.db.models.functions import Least, RowNumber
+from django.utils import timezone
+
+from .leaderboard import CONSISTENCY_POINTS_PER_REVIEW, MAX_CONSISTENCY_SCORE, VERIFIED_REVIEW_POINTS
+from .models import LiteracyAchievement, LiteracyLeaderboard, MonthlyAmbassador
+
+
+AMBASSADOR_SCOPES = ['class', 'grade']
+
+
+def month_bounds(month):
+    """First day of `month`'s month and of the month after it"""
+    first = month.replace(day=1)
+    following = date(first.year + first.month // 12, first.month % 12 + 1, 1)
+    return first, following
+
+
+def previous_month(today=None):
+    today = today or timezone.localdate()
+    first = today.replace(day=1)
+    return date(first.year - (first.month == 1), (first.month - 2) % 12 + 1, 1)
+
+
+def monthly_winners(month):
+    """
+    The top leaderboard row of every class and grade by the score earned in
+    `month`, annotated with monthly_score. Students who earned nothing that
+    month are never picked.
+    """
+    first, following = month_bounds(month)
+    start = timezone.make_aware(datetime.combine(first, time.min))
+    end = timezone.make_aware(datetime.combine(following, time.min))
+
+    verified = Count(
+        'student__book_reviews',
+        filter=Q(
+            student__book_reviews__status='verified',
+            student__book_reviews__verified_at__gte=start,
+            student__book_reviews__verified_at__lt=end,
+        ),
+    )
+    submitted = Count(
+        'student__book_reviews',
+        filter=Q(student__book_reviews__created_at__gte=start, student__book_reviews__created_at__lt=end),
+    )
+    return LiteracyLeaderboard.objects.filter(scope__in=AMBASSADOR_SCOPES).annotate(
+        monthly_score=verified * VERIFIED_REVIEW_POINTS + Least(
+            submitted * CONSISTENCY_POINTS_PER_REVIEW, Value(MAX_CONSISTENCY_SCORE)
+        ),
+    ).annotate(
+        position=Window(
+            expression=RowNumber(),
+            partition_by=[F('scope'), F('scope_value')],
+            order_by=[F('monthly_score').desc(), F('total_score').desc(), F('student_id').asc()],
+        ),
+    ).filter(position=1, monthly_score__gt=0).order_by('scope', 'scope_value')
+
+
+def select_monthly_ambassadors(month=None):
+    """
+    Choose the ambassadors for `month` (by default the previous month),
+    replacing any earlier selection for it, and return the MonthlyAmbassador
+    rows
+    """
+    month = month_bounds(month or previous_month())[0]
+    winners = list(monthly_winners(month))
+
+    ambassadors = [
+        MonthlyAmbassador(
+            month=month,
+            scope=entry.scope,
+            scope_value=entry.scope_value,
+            student_id=entry.student_id,
+            total_score=entry.monthly_score,
+        )
+        for entry in winners
+    ]
+
+    with transaction.atomic():
+        MonthlyAmbassador.objects.filter(month=month).delete()
+        MonthlyAmbassador.objects.bulk_create(ambassadors)
+
+        # The flags mark the latest month's ambassadors only
+        if not MonthlyAmbassador.objects.filter(month__gt=month).exists():
+            LiteracyLeaderboard.objects.filter(is_monthly_ambassador=True).update(is_monthly_ambassador=False)
+            LiteracyLeaderboard.objects.filter(pk__in=[entry.pk for entry in winners]).update(
+                is_monthly_ambassador=True
+            )
+
+        LiteracyAchievement.objects.bulk_create(
+            [
+                LiteracyAchievement(student_id=student_id, achievement_type='ambassador')
+                for student_id in {entry.student_id for entry in winners}
+            ],
+            ignore_conflicts=True,
+        )
+
+    return ambassadors
+
+
+def latest_ambassadors():
+    """The most recent month's ambassadors, in one query"""
+    latest_month = MonthlyAmbassador.objects.order_by('-month').values('month')[:1]
+    return MonthlyAmbassador.objects.filter(month=latest_month).select_related('student')
@@ -3,3 +3,40 @@ from django.apps import AppConfig
 
 class LiteracyConfig(AppConfig):
     name = 'literacy'
+
+    def ready(self):
+        # Keep leaderboard scores up to date as reviews change
+        from .signals import review_submitted, review_verified, review_rejected
+        from .leaderboard import on_review_submitted, on_review_verified, on_review_rejected
+        review_submitted.connect(on_review_submitted)
+        review_verified.connect(on_review_verified)
+        review_rejected.connect(on_review_rejected)
+
+        # Award the achievements a student earns when a review is verified
+        from .achievements import award_on_verification
+        review_verified.connect(award_on_verification)
+
+        # Drop cached review counts when a student's reviews change
+        from django.contrib.auth.models import User
+        from django.db.models.signals import post_save, post_delete
+        from .models import BookReview, LiteracyPost, LiteracyComment
+        from .stats import on_review_changed
+        post_save.connect(on_review_changed, sender=BookReview)
+        post_delete.connect(on_review_changed, sender=BookReview)
+
+        # Keep the forum's comment counters in step
+        from .engagement import on_comment_saved, on_comment_deleted, on_forum_changed
+        post_save.connect(on_comment_saved, sender=LiteracyComment)
+        post_delete.connect(on_comment_deleted, sender=LiteracyComment)
+
+        # Drop cached forum pages when posts or likes change
+        from .signals import post_like_toggled
+        post_save.connect(on_forum_changed, sender=LiteracyPost)
+        post_delete.connect(on_forum_changed, sender=LiteracyPost)
+        post_like_toggled.connect(on_forum_changed)
+
+        # Keep the forum search index in step with posts
+        from .search import on_post_saved, on_post_deleted, on_user_saved
+        post_save.connect(on_post_saved, sender=LiteracyPost)
+        post_delete.connect(on_post_deleted, sender=LiteracyPost)
+        post_save.connect(on_user_saved, sender=User)
@@ -0,0 +1,115 @@
+"""
+Denormalized forum engagement counters
+LiteracyPost.like_count is kept in step by LiteracyPost.toggle_like and
+comment_count by the comment receivers below, both with atomic F() updates.
+repair_post_counters recounts the columns from the likes and comments tables.
+Forum listing pages are cached in the 'forum' namespace, which moves to a new
+version whenever a post, like or comment changes.
+"""
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import LiteracyPost, LiteracyComment
+from nasa_library.cache import invalidate_namespace, get_or_compute
+from nasa_library.pagination import keyset_paginate
+
+
+FORUM_CACHE = 'forum'
+FORUM_PAGE_TIMEOUT = 60
+
+
+def get_forum_page(sort_by='recent', cursor=None, per_page=20):
+    """A cached KeysetPage of posts, newest or most liked first"""
+    field = 'like_count' if sort_by == 'popular' else 'created_at'
+
+    def compute():
+        return keyset_paginate(
+            LiteracyPost.objects.select_related('student', 'book_review'),
+            field,
+            cursor=cursor,
+            per_page=per_page,
+        )
+
+    return get_or_compute(FORUM_CACHE, [field, per_page, cursor or ''], compute, timeout=FORUM_PAGE_TIMEOUT)
+
+
+def mark_liked(posts, user):
+    """Set post.user_liked on each post with one query"""
+    Like = LiteracyPost.likes.through
+    liked = set(
+        Like.objects.filter(
+            user=user, literacypost__in=[post.pk for post in posts]
+        ).values_list('literacypost_id', flat=True)
+    )
+    for post in posts:
+        post.user_liked = post.pk in liked
+
+
+def on_forum_changed(sender, **kwargs):
+    invalidate_namespace(FORUM_CACHE)
+
+
+def _add_comments(post_id, delta):
+    LiteracyPost.objects.filter(pk=post_id).update(comment_count=F('comment_count') + delta)
+
+
+def on_comment_saved(sender, instance, created, **kwargs):
+    if created:
+        _add_comments(instance.post_id, 1)
+        on_forum_changed(sender)
+
+
+def on_comment_deleted(sender, instance, **kwargs):
+    _add_comments(instance.post_id, -1)
+    on_forum_changed(sender)
+
+
+def _counted(queryset):
+    """Scalar subquery counting the rows of `queryset` that belong to the outer post"""
+    return Coalesce(
+        Subquery(
+            queryset.order_by().values('post_ref').annotate(total=Count('*')).values('total'),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def repair_post_counters(batch_size=1000, dry_run=False):
+    """
+    Recount like_count and comment_count for all posts, `batch_size` posts per
+    transaction, and return the number of posts whose counters had drifted.
+    With dry_run=True drifted rows are only counted.
+    """
+    Like = LiteracyPost.likes.through
+    likes = Like.objects.filter(literacypost=OuterRef('pk')).annotate(post_ref=F('literacypost'))
+    comments = LiteracyComment.objects.filter(post=OuterRef('pk')).annotate(post_ref=F('post'))
+
+    repaired = 0
+    last_pk = 0
+    while True:
+        batch_pks = list(
+            LiteracyPost.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not batch_pks:
+            return repaired
+        last_pk = batch_pks[-1]
+
+        with transaction.atomic():
+            drifted = LiteracyPost.objects.filter(
+                pk__gte=batch_pks[0], pk__lte=last_pk
+            ).annotate(
+                actual_likes=_counted(likes),
+                actual_comments=_counted(comments),
+            ).filter(
+                ~Q(like_count=F('actual_likes')) | ~Q(comment_count=F('actual_comments'))
+            ).values_list('pk', 'actual_likes', 'actual_comments')
+
+            fixed = [
+                LiteracyPost(pk=pk, like_count=like_count, comment_count=comment_count)
+                for pk, like_count, comment_count in drifted
+            ]
+            if not dry_run:
+                LiteracyPost.objects.bulk_update(fixed, ['like_count', 'comment_count'])
+            repaired += len(fixed)
@@ -20,7 +20,9 @@ class BookReviewForm(forms.ModelForm):
             'title': forms.TextInput(attrs={
                 'class': 'w-full px-4 py-2 border border-gray-300 rounded-lg focus:outline-none focus:border-blue-600 focus:ring-1 focus:ring-blue-600',
                 'placeholder': 'Enter book title',
-                'maxlength': '255'
+                'maxlength': '255',
+                'list': 'book-suggestions',
+                'autocomplete': 'off'
             }),
             'author': forms.TextInput(attrs={
                 'class': 'w-full px-4 py-2 border border-gray-300 rounded-lg focus:outline-none focus:border-blue-600 focus:ring-1 focus:ring-blue-600',
@@ -0,0 +1,412 @@
+"""
+Leaderboard scoring
+Review events apply small F() score deltas to a student's LiteracyLeaderboard
+rows, recounting only that student's 30-day consistency window, and once
+committed bump the cache version of each scope the student is in, so those
+pages are recomputed on their next view. Ranks are not persisted
+on that path: pages and the viewer's own rank count them on read (1 + rows
+with a higher score, served by the (scope, scope_value, -total_score) index).
+recalculate_leaderboard is the nightly reconciliation job: it recomputes
+every row with a fixed number of queries (one grouped query for the review
+counts, in-memory scoring, one bulk upsert and a RANK() window query) and
+reports how far the incremental scores had drifted.
+Each (scope, scope_value) leaderboard has its own cache version. The
+reconciliation job bumps it, caches the scope's first page and renders it
+into the template fragment cache (publish_leaderboards), so leaderboard_view
+only computes the viewer's own rank and stats.
+"""
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value, Window
+from django.db.models.functions import Coalesce, Rank, RowNumber
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+from datetime import timedelta
+from urllib.parse import quote
+
+from .models import BookReview, LiteracyLeaderboard
+from authentication.models import UserProfile
+from nasa_library.cache import bump_namespace, get_or_compute, namespace_version, store
+from nasa_library.pagination import KeysetPage, encode_cursor, keyset_paginate
+
+
+VERIFIED_REVIEW_POINTS = 20
+CONSISTENCY_POINTS_PER_REVIEW = 10
+MAX_CONSISTENCY_SCORE = 100
+CONSISTENCY_WINDOW_DAYS = 30
+
+LEADERBOARD_PAGE_SIZE = 100
+LEADERBOARD_CACHE = 'leaderboard'
+# Pages are keyed by their scope's version, so they can be kept for long
+LEADERBOARD_PAGE_TIMEOUT = 24 * 60 * 60
+LEADERBOARD_FRAGMENT_TEMPLATE = 'leaderboard-page.html'
+
+
+def calculate_score(verified_count, recent_count):
+    """Return (consistency_score, total_score) for a student's review counts"""
+    consistency_score = min(recent_count * CONSISTENCY_POINTS_PER_REVIEW, MAX_CONSISTENCY_SCORE)
+    total_score = verified_count * VERIFIED_REVIEW_POINTS + consistency_score
+    return consistency_score, total_score
+
+
+def grade_for_class(kelas):
+    """The grade part of a class name, e.g. 'XI' for 'XI IPA 2'"""
+    parts = (kelas or '').split()
+    return parts[0] if parts else None
+
+
+def student_scopes(kelas):
+    """The (scope, scope_value) pairs a student with the given class belongs to"""
+    scopes = [('school', 'school')]
+    grade = grade_for_class(kelas)
+    if grade:
+        scopes.append(('class', kelas))
+        scopes.append(('grade', grade))
+    return scopes
+
+
+def resolve_scope(user_profile, scope):
+    """Map a requested leaderboard scope to the (scope, scope_value) to display"""
+    if scope == 'class' and user_profile.kelas:
+        return 'class', user_profile.kelas
+    if scope == 'grade':
+        return 'grade', grade_for_class(user_profile.kelas) or 'X'
+    return 'school', 'school'
+
+
+def _scope_namespace(scope, scope_value):
+    return f"{LEADERBOARD_CACHE}:{quote(f'{scope}:{scope_value}', safe='')}"
+
+
+def leaderboard_version(scope, scope_value):
+    """The cache version of one leaderboard, bumped whenever its scores change"""
+    return namespace_version(_scope_namespace(scope, scope_value))
+
+
+def _page_parts(scope, scope_value, cursor, per_page):
+    return [scope, scope_value, leaderboard_version(scope, scope_value), per_page, cursor or '']
+
+
+def get_leaderboard_page(scope, scope_value, cursor=None, per_page=LEADERBOARD_PAGE_SIZE):
+    """A cached KeysetPage of leaderboard entries, highest score first"""
+    def compute():
+        page = keyset_paginate(
+            LiteracyLeaderboard.objects.filter(
+                scope=scope,
+                scope_value=scope_value
+            ).select_related('student').annotate(current_rank=_live_rank(scope, scope_value)),
+            'total_score',
+            cursor=cursor,
+            per_page=per_page,
+        )
+        for entry in page:
+            entry.rank = entry.current_rank
+        return page
+
+    return get_or_compute(
+        LEADERBOARD_CACHE,
+        _page_parts(scope, scope_value, cursor, per_page),
+        compute,
+        timeout=LEADERBOARD_PAGE_TIMEOUT,
+    )
+
+
+def leaderboard_page_context(scope, scope_value, cursor=None):
+    """
+    Context for LEADERBOARD_FRAGMENT_TEMPLATE. The page itself is only
+    loaded if the fragment for this version is not cached yet.
+    """
+    cursor = cursor or ''
+    return {
+        'scope': scope,
+        'scope_value': scope_value,
+        'cursor': cursor,
+        'leaderboard_version': leaderboard_version(scope, scope_value),
+        'leaderboard_timeout': LEADERBOARD_PAGE_TIMEOUT,
+        'leaderboard': SimpleLazyObject(lambda: get_leaderboard_page(scope, scope_value, cursor)),
+    }
+
+
+def _scope_filter(scope_keys):
+    scope_filter = Q()
+    for scope, scope_value in scope_keys:
+        scope_filter |= Q(scope=scope, scope_value=scope_value)
+    return scope_filter
+
+
+def _first_pages(scope_keys, per_page=LEADERBOARD_PAGE_SIZE):
+    """The first KeysetPage of each scope, read with one windowed query"""
+    rows = {key: [] for key in scope_keys}
+    if rows:
+        entries = LiteracyLeaderboard.objects.filter(_scope_filter(scope_keys)).annotate(
+            position=Window(
+                expression=RowNumber(),
+                partition_by=[F('scope'), F('scope_value')],
+                order_by=[F('total_score').desc(), F('pk').desc()],
+            )
+        ).filter(position__lte=per_page + 1).select_related('student').order_by('position')
+        for entry in entries:
+            rows[(entry.scope, entry.scope_value)].append(entry)
+
+    pages = {}
+    for key, entries in rows.items():
+        next_cursor = None
+        if len(entries) > per_page:
+            entries = entries[:per_page]
+            next_cursor = encode_cursor(entries[-1].total_score, entries[-1].pk)
+        pages[key] = KeysetPage(entries, next_cursor)
+    return pages
+
+
+def publish_leaderboards(scope_keys):
+    """
+    Move each (scope, scope_value) to a new version and pre-render its first
+    page. The page itself is cached too, for views that need its entries.
+    """
+    for (scope, scope_value), page in _first_pages(list(scope_keys)).items():
+        bump_namespace(_scope_namespace(scope, scope_value))
+        store(
+            LEADERBOARD_CACHE,
+            _page_parts(scope, scope_value, None, LEADERBOARD_PAGE_SIZE),
+            page,
+            timeout=LEADERBOARD_PAGE_TIMEOUT,
+        )
+        context = leaderboard_page_context(scope, scope_value)
+        context['leaderboard'] = page
+        render_to_string(LEADERBOARD_FRAGMENT_TEMPLATE, context)
+
+
+def _live_rank(scope, scope_value):
+    """1 + the number of rows in the scope with a higher score than the outer row"""
+    higher = LiteracyLeaderboard.objects.filter(
+        scope=scope,
+        scope_value=scope_value,
+        total_score__gt=OuterRef('total_score'),
+    ).order_by().values('scope').annotate(total=Count('*')).values('total')
+    return Coalesce(Subquery(higher, output_field=IntegerField()), Value(0)) + 1
+
+
+def get_rank_window(student, scope, scope_value, radius=5):
+    """
+    Return a student's leaderboard entry, rank and up to `radius` neighbours
+    above and below in the given scope, or None if they have no entry.
+    Ranks are counted on read rather than taken from the persisted rank,
+    which is only refreshed by the nightly job. Uses the
+    (scope, scope_value, -total_score) index, so the cost does not depend on
+    where in the scope the student is.
+    """
+    entries = LiteracyLeaderboard.objects.filter(
+        scope=scope, scope_value=scope_value
+    ).select_related('student').annotate(current_rank=_live_rank(scope, scope_value))
+    entry = entries.filter(student=student).first()
+    if entry is None:
+        return None
+
+    # Neighbours in leaderboard order (-total_score, -pk)
+    above = list(entries.filter(
+        Q(total_score__gt=entry.total_score) |
+        Q(total_score=entry.total_score, pk__gt=entry.pk)
+    ).order_by('total_score', 'pk')[:radius])
+    below = list(entries.filter(
+        Q(total_score__lt=entry.total_score) |
+        Q(total_score=entry.total_score, pk__lt=entry.pk)
+    ).order_by('-total_score', '-pk')[:radius])
+
+    for row in [entry] + above + below:
+        row.rank = row.current_rank
+
+    return {
+        'entry': entry,
+        'rank': entry.rank,
+        'above': list(reversed(above)),
+        'below': below,
+    }
+
+
+def refresh_ranks(scope_keys=None):
+    """
+    Persist RANK() over descending total_score within each (scope, scope_value),
+    optionally only for the given (scope, scope_value) pairs. Only rows whose
+    rank changed are written. Returns the number of rows updated.
+    """
+    entries = LiteracyLeaderboard.objects.all()
+    if scope_keys is not None:
+        scope_filter = _scope_filter(scope_keys)
+        if not scope_filter:
+            return 0
+        entries = entries.filter(scope_filter)
+
+    ranked = entries.annotate(
+        new_rank=Window(
+            expression=Rank(),
+            partition_by=[F('scope'), F('scope_value')],
+            order_by=F('total_score').desc(),
+        )
+    ).values_list('pk', 'rank', 'new_rank').order_by()
+
+    changed = [
+        LiteracyLeaderboard(pk=pk, rank=new_rank)
+        for pk, rank, new_rank in ranked
+        if rank != new_rank
+    ]
+    LiteracyLeaderboard.objects.bulk_update(changed, ['rank'], batch_size=500)
+    return len(changed)
+
+
+def apply_score_delta(student, verified=0):
+    """
+    Apply a verified review count delta to all of a student's leaderboard
+    rows with atomic F() updates, creating the rows first if the student has
+    none. The consistency score is recounted from the student's reviews of
+    the last CONSISTENCY_WINDOW_DAYS, so it also goes down as older reviews
+    leave the window. The student's scopes move to a new cache version once
+    the transaction commits; persisted ranks are left to
+    recalculate_leaderboard.
+    """
+    try:
+        profile = student.profile
+    except ObjectDoesNotExist:
+        return
+    if not profile.is_student():
+        return
+
+    scope_keys = student_scopes(profile.kelas)
+    LiteracyLeaderboard.objects.bulk_create(
+        [
+            LiteracyLeaderboard(student=student, scope=scope, scope_value=scope_value)
+            for scope, scope_value in scope_keys
+        ],
+        ignore_conflicts=True,
+    )
+
+    cutoff = timezone.now() - timedelta(days=CONSISTENCY_WINDOW_DAYS)
+    recent = BookReview.objects.filter(student=student, created_at__gte=cutoff).count()
+    consistency_score = calculate_score(0, recent)[0]
+
+    # Every right-hand side reads the row's values from before the update
+    changes = {
+        'books_read': F('books_read') + verified,
+        'verified_reviews': F('verified_reviews') + verified,
+        'consistency_score': Value(consistency_score),
+        'total_score': F('total_score') + verified * VERIFIED_REVIEW_POINTS
+        - F('consistency_score') + consistency_score,
+        'last_updated': timezone.now(),
+    }
+
+    LiteracyLeaderboard.objects.filter(student=student).update(**changes)
+
+    def bump_scopes():
+        for scope, scope_value in scope_keys:
+            bump_namespace(_scope_namespace(scope, scope_value))
+
+    transaction.on_commit(bump_scopes)
+
+
+def on_review_submitted(sender, review, **kwargs):
+    apply_score_delta(review.student, verified=int(review.status == 'verified'))
+
+
+def on_review_verified(sender, review, previous_status, **kwargs):
+    if previous_status != 'verified':
+        apply_score_delta(review.student, verified=1)
+
+
+def on_review_rejected(sender, review, previous_status, **kwargs):
+    if previous_status == 'verified':
+        apply_score_delta(review.student, verified=-1)
+
+
+def recalculate_leaderboard(dry_run=False):
+    """
+    Recompute all leaderboard rows in one transaction and return a summary
+    dict with the number of students, rows written, stale rows removed and
+    the drift between the stored (incrementally updated) and recomputed rows.
+    With dry_run=True nothing is written.
+    """
+    started = timezone.now()
+    cutoff = started - timedelta(days=CONSISTENCY_WINDOW_DAYS)
+
+    students = list(
+        UserProfile.objects.filter(role='student').values_list('user_id', 'kelas')
+    )
+
+    review_counts = {
+        row['student']: row
+        for row in BookReview.objects.values('student').annotate(
+            verified=Count('id', filter=Q(status='verified')),
+            recent=Count('id', filter=Q(created_at__gte=cutoff)),
+        ).order_by()
+    }
+
+    entries = []
+    for user_id, kelas in students:
+        counts = review_counts.get(user_id, {})
+        verified_count = counts.get('verified', 0)
+        consistency_score, total_score = calculate_score(verified_count, counts.get('recent', 0))
+
+        for scope, scope_value in student_scopes(kelas):
+            entries.append(LiteracyLeaderboard(
+                student_id=user_id,
+                scope=scope,
+                scope_value=scope_value,
+                books_read=verified_count,
+                verified_reviews=verified_count,
+                consistency_score=consistency_score,
+                total_score=total_score,
+            ))
+
+    # Compare the stored rows with the recomputed ones
+    stored = {
+        (student_id, scope, scope_value): (books_read, consistency_score, total_score)
+        for student_id, scope, scope_value, books_read, consistency_score, total_score
+        in LiteracyLeaderboard.objects.values_list(
+            'student_id', 'scope', 'scope_value', 'books_read', 'consistency_score', 'total_score'
+        ).order_by()
+    }
+    drift = []
+    for entry in entries:
+        key = (entry.student_id, entry.scope, entry.scope_value)
+        expected = (entry.books_read, entry.consistency_score, entry.total_score)
+        actual = stored.pop(key, None)
+        if actual != expected:
+            drift.append({
+                'student': entry.student_id,
+                'scope': entry.scope,
+                'scope_value': entry.scope_value,
+                'stored_score': actual[2] if actual else None,
+                'expected_score': entry.total_score,
+            })
+
+    summary = {
+        'students': len(students),
+        'rows': len(entries),
+        'removed': len(stored),
+        'drift': drift,
+    }
+    if dry_run:
+        return summary
+
+    with transaction.atomic():
+        LiteracyLeaderboard.objects.bulk_create(
+            entries,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['student', 'scope', 'scope_value'],
+            update_fields=[
+                'books_read',
+                'verified_reviews',
+                'consistency_score',
+                'total_score',
+                'last_updated',
+            ],
+        )
+        # Rows for students who left a class (or are no longer students)
+        summary['removed'], _ = LiteracyLeaderboard.objects.filter(last_updated__lt=started).delete()
+        refresh_ranks()
+
+    # Including scopes that just lost all of their rows
+    scope_keys = {key[1:] for key in stored} | {(entry.scope, entry.scope_value) for entry in entries}
+    publish_leaderboards(sorted(scope_keys))
+
+    return summary
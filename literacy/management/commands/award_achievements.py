@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from literacy.achievements import RULES, award_achievements
+
+
+class Command(BaseCommand):
+    help = 'Award literacy achievements to every student who has earned them, reporting time per rule'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rule',
+            action='append',
+            choices=list(RULES),
+            help='Only evaluate this achievement rule (can be repeated)'
+        )
+        parser.add_argument(
+            '--student',
+            type=int,
+            help='Only evaluate the rules for this user id'
+        )
+
+    def handle(self, *args, **options):
+        report = award_achievements(student_id=options['student'], rules=options['rule'])
+
+        for achievement_type, result in report.items():
+            self.stdout.write(
+                f"  {achievement_type}: {result['awarded']} awarded ({result['seconds'] * 1000:.1f}ms)"
+            )
+        total = sum(result['awarded'] for result in report.values())
+        elapsed = sum(result['seconds'] for result in report.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Awarded {total} achievements across {len(report)} rules ({elapsed:.2f}s)'
+        ))
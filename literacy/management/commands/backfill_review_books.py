@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+import time
+
+from book.catalogue import book_keys, resolve_books
+from literacy.models import BookReview
+
+
+class Command(BaseCommand):
+    help = 'Link book reviews without a catalogue book to Book entries, clustering free-text titles and authors'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of reviews linked per transaction'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        started = time.perf_counter()
+        linked = 0
+        skipped = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                BookReview.objects.filter(book__isnull=True, pk__gt=last_pk).order_by('pk').values(
+                    'pk', 'title', 'author', 'publisher', 'year_published'
+                )[:options['batch_size']]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1]['pk']
+
+            # The first review of each book in the batch supplies its display details
+            review_keys = {}
+            details = {}
+            for review in batch:
+                keys = book_keys(review['title'], review['author'])
+                if not all(keys):
+                    skipped += 1
+                    continue
+                review_keys[review['pk']] = keys
+                details.setdefault(keys, {
+                    'title': review['title'].strip(),
+                    'author': review['author'].strip(),
+                    'publisher': review['publisher'].strip(),
+                    'year_published': review['year_published'],
+                })
+
+            with transaction.atomic():
+                book_ids = resolve_books(details)
+                BookReview.objects.bulk_update(
+                    [BookReview(pk=pk, book_id=book_ids[keys]) for pk, keys in review_keys.items()],
+                    ['book'],
+                    batch_size=500,
+                )
+            linked += len(review_keys)
+            self.stdout.write(f'Linked {linked} reviews...')
+
+        if skipped:
+            self.stdout.write(self.style.WARNING(f'{skipped} reviews have no usable title or author'))
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Linked {linked} reviews to catalogue books ({time.perf_counter() - started:.2f}s)'
+        ))
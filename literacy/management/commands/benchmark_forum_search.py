@@ -0,0 +1,101 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+import random
+import time
+
+from literacy.models import LiteracyPost
+from literacy.search import rebuild_search_index, search_posts
+
+
+WORDS = (
+    'buku cerita membaca perpustakaan sekolah novel pelangi laskar bumi manusia '
+    'sejarah sains petualangan persahabatan keluarga mimpi belajar guru siswa '
+    'penulis halaman tokoh akhir awal pesan moral inspirasi dunia waktu'
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the forum full-text search index with the icontains search on seeded '
+        'posts. Seeded rows are rolled back when the benchmark finishes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=50_000, help='Number of posts to seed')
+        parser.add_argument('--students', type=int, default=500, help='Number of seeded authors')
+        parser.add_argument('--repeat', type=int, default=10, help='Timed runs per query')
+        parser.add_argument('--batch-size', type=int, default=5000, help='bulk_create batch size')
+        parser.add_argument(
+            '--query',
+            action='append',
+            dest='queries',
+            help='Search text to time (repeatable). Defaults to a few common searches'
+        )
+
+    def handle(self, *args, **options):
+        if options['posts'] < 1 or options['students'] < 1:
+            raise CommandError('--posts and --students must be positive')
+
+        with transaction.atomic():
+            self.seed(options)
+            self.compare(options['queries'] or ['pelangi', 'guru sekolah', 'sej'], options['repeat'])
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('\n✓ Benchmark finished, seeded rows rolled back'))
+
+    def seed(self, options):
+        started = time.perf_counter()
+        users = User.objects.bulk_create(
+            User(username=f'forum-benchmark-{i}', first_name=random.choice(WORDS).title())
+            for i in range(options['students'])
+        )
+
+        batch = []
+        for _ in range(options['posts']):
+            batch.append(LiteracyPost(
+                student=random.choice(users),
+                title=' '.join(random.choices(WORDS, k=4)).capitalize(),
+                content=' '.join(random.choices(WORDS, k=80)),
+            ))
+            if len(batch) >= options['batch_size']:
+                LiteracyPost.objects.bulk_create(batch)
+                batch = []
+        LiteracyPost.objects.bulk_create(batch)
+
+        # bulk_create skips the post_save receivers that maintain the index
+        indexed = rebuild_search_index()
+        self.stdout.write(
+            f"Seeded {options['posts']} posts, indexed {indexed} in {time.perf_counter() - started:.1f}s"
+        )
+
+    def time_runs(self, repeat, run):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            count = run()
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        return count, timings
+
+    def compare(self, queries, repeat):
+        for query in queries:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n"{query}" (first page)'))
+            icontains = LiteracyPost.objects.filter(
+                Q(title__icontains=query) |
+                Q(content__icontains=query) |
+                Q(student__first_name__icontains=query) |
+                Q(student__last_name__icontains=query)
+            ).order_by('-created_at')
+            cases = [
+                ('icontains', lambda: len(list(icontains[:20]))),
+                ('index', lambda: len(search_posts(query)[0])),
+            ]
+            for label, run in cases:
+                count, timings = self.time_runs(repeat, run)
+                self.stdout.write(
+                    f'  {label:<9} results={count:<4} '
+                    f'median={timings[len(timings) // 2] * 1000:.2f}ms '
+                    f'min={timings[0] * 1000:.2f}ms'
+                )
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+import time
+
+from literacy.search import rebuild_search_index, search_supported
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the forum full-text search index from the literacy posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of posts indexed per statement'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        if not search_supported():
+            self.stdout.write(self.style.WARNING(
+                f'No search index for the {connection.vendor} backend, forum search uses icontains'
+            ))
+            return
+
+        started = time.perf_counter()
+        indexed = rebuild_search_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Indexed {indexed} posts ({time.perf_counter() - started:.2f}s)'
+        ))
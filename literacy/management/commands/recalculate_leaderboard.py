@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+import time
+
+from literacy.leaderboard import recalculate_leaderboard
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconcile literacy leaderboard scores and ranks for all students and report '
+        'drift from the incrementally updated scores'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report drift, do not write any rows'
+        )
+        parser.add_argument(
+            '--show',
+            type=int,
+            default=20,
+            help='Number of drifted rows to list'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        summary = recalculate_leaderboard(dry_run=options['dry_run'])
+        elapsed = time.perf_counter() - started
+
+        drift = summary['drift']
+        if drift:
+            self.stdout.write(self.style.WARNING(f'{len(drift)} leaderboard rows drifted:'))
+            for row in drift[:options['show']]:
+                self.stdout.write(
+                    f"  student={row['student']} {row['scope']}:{row['scope_value']} "
+                    f"stored={row['stored_score']} expected={row['expected_score']}"
+                )
+            if len(drift) > options['show']:
+                self.stdout.write(f"  ... and {len(drift) - options['show']} more")
+        else:
+            self.stdout.write('No drift between stored and recomputed scores')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(
+                f"Dry run: {summary['rows']} rows would be written, "
+                f"{summary['removed']} stale rows would be removed ({elapsed:.2f}s)"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"✓ Scored {summary['students']} students: {summary['rows']} leaderboard rows written, "
+                f"{summary['removed']} stale rows removed ({elapsed:.2f}s)"
+            ))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+import time
+
+from literacy.engagement import repair_post_counters
+
+
+class Command(BaseCommand):
+    help = 'Recount the like and comment counters of forum posts and fix any that have drifted'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of posts recounted per transaction'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report drifted posts, do not write any rows'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        started = time.perf_counter()
+        repaired = repair_post_counters(batch_size=options['batch_size'], dry_run=options['dry_run'])
+        elapsed = time.perf_counter() - started
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(
+                f'Dry run: {repaired} posts have drifted counters ({elapsed:.2f}s)'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ Repaired counters on {repaired} posts ({elapsed:.2f}s)'
+            ))
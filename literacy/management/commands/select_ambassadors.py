@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from datetime import datetime
+
+from literacy.ambassadors import previous_month, select_monthly_ambassadors
+
+
+class Command(BaseCommand):
+    help = 'Choose the monthly literacy ambassadors: the top scorer of every class and grade'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--month',
+            help='Month to choose ambassadors for, as YYYY-MM (default: last month)'
+        )
+
+    def handle(self, *args, **options):
+        if options['month']:
+            try:
+                month = datetime.strptime(options['month'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError(f"Invalid month '{options['month']}', expected YYYY-MM")
+        else:
+            month = previous_month()
+
+        ambassadors = select_monthly_ambassadors(month)
+
+        if not ambassadors:
+            self.stdout.write(self.style.WARNING(f'No reviews scored in {month:%B %Y}, no ambassadors chosen'))
+            return
+        for ambassador in ambassadors:
+            self.stdout.write(
+                f'  {ambassador.scope}:{ambassador.scope_value} '
+                f'student={ambassador.student_id} score={ambassador.total_score}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Chose {len(ambassadors)} ambassadors for {month:%B %Y}'
+        ))
@@ -0,0 +1,56 @@
+# Generated by Django 6.0.2 on 2026-10-17 17:26
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_engagement(apps, schema_editor):
+    LiteracyPost = apps.get_model('literacy', 'LiteracyPost')
+    LiteracyComment = apps.get_model('literacy', 'LiteracyComment')
+    Like = LiteracyPost.likes.through
+
+    def counted(queryset, field):
+        return Coalesce(
+            Subquery(
+                queryset.order_by().values(field).annotate(total=Count('*')).values('total'),
+                output_field=IntegerField(),
+            ),
+            Value(0),
+        )
+
+    LiteracyPost.objects.update(
+        like_count=counted(Like.objects.filter(literacypost=OuterRef('pk')), 'literacypost'),
+        comment_count=counted(LiteracyComment.objects.filter(post=OuterRef('pk')), 'post'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('literacy', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='literacypost',
+            name='comment_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='literacypost',
+            name='like_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(count_engagement, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='literacypost',
+            index=models.Index(fields=['-like_count', '-created_at'], name='literacy_li_like_co_93fea3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='literacypost',
+            index=models.Index(fields=['-comment_count', '-created_at'], name='literacy_li_comment_369881_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 6.0.2 on 2026-10-17 18:05
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE literacy_post_search USING fts5('
+            'title, content, author, tokenize="unicode61 remove_diacritics 2")'
+        )
+        schema_editor.execute(
+            "INSERT INTO literacy_post_search (rowid, title, content, author) "
+            "SELECT p.id, p.title, p.content, TRIM(u.first_name || ' ' || u.last_name) "
+            "FROM literacy_literacypost p JOIN auth_user u ON u.id = p.student_id"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE TABLE literacy_post_search ('
+            'post_id bigint PRIMARY KEY REFERENCES literacy_literacypost (id) '
+            'ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, '
+            'document tsvector NOT NULL)'
+        )
+        schema_editor.execute(
+            'CREATE INDEX literacy_post_search_document_gin ON literacy_post_search USING GIN (document)'
+        )
+        schema_editor.execute(
+            "INSERT INTO literacy_post_search (post_id, document) "
+            "SELECT p.id, "
+            "setweight(to_tsvector('simple', p.title), 'A') || "
+            "setweight(to_tsvector('simple', p.content), 'B') || "
+            "setweight(to_tsvector('simple', u.first_name || ' ' || u.last_name), 'C') "
+            "FROM literacy_literacypost p JOIN auth_user u ON u.id = p.student_id"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute('DROP TABLE IF EXISTS literacy_post_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('literacy', '0002_literacypost_engagement_counters'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 6.0.2 on 2026-10-17 17:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book', '0001_initial'),
+        ('literacy', '0003_post_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookreview',
+            name='book',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reviews', to='book.book'),
+        ),
+    ]
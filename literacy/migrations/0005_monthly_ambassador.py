@@ -0,0 +1,34 @@
+# Generated by Django 6.0.2 on 2026-10-17 18:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('literacy', '0004_bookreview_book'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyAmbassador',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('scope', models.CharField(choices=[('class', 'By Class'), ('grade', 'By Grade')], max_length=20)),
+                ('scope_value', models.CharField(help_text='Class name or grade', max_length=100)),
+                ('total_score', models.IntegerField(default=0, help_text='Score earned during the month')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ambassadorships', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Monthly Ambassador',
+                'verbose_name_plural': 'Monthly Ambassadors',
+                'ordering': ['-month', 'scope', 'scope_value'],
+                'constraints': [models.UniqueConstraint(fields=('month', 'scope', 'scope_value'), name='unique_monthly_ambassador')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0.2 on 2026-10-17 18:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('literacy', '0005_monthly_ambassador'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='literacypost',
+            name='literacy_li_like_co_93fea3_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='literacypost',
+            name='literacy_li_comment_369881_idx',
+        ),
+        migrations.AddIndex(
+            model_name='literacypost',
+            index=models.Index(fields=['-created_at', '-id'], name='literacy_li_created_a35379_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='literacypost',
+            index=models.Index(fields=['-like_count', '-id'], name='literacy_li_like_co_296027_idx'),
+        ),
+    ]
@@ -1,8 +1,23 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
-from django.db.models import Count, Q
-from datetime import timedelta
+from django.db.models import Count, F, Q
+
+from .signals import review_submitted, review_verified, review_rejected, post_like_toggled
+from book.models import Book
+from book.catalogue import book_for
+
+
+class BookReviewQuerySet(models.QuerySet):
+    
+    def status_counts(self):
+        """Total, pending, verified and rejected review counts in one query"""
+        return self.aggregate(
+            total=Count('id'),
+            pending=Count('id', filter=Q(status='pending')),
+            verified=Count('id', filter=Q(status='verified')),
+            rejected=Count('id', filter=Q(status='rejected')),
+        )
 
 
 class BookReview(models.Model):
@@ -16,6 +31,15 @@ class BookReview(models.Model):
     
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='book_reviews')
     
+    # Catalogue entry matched from the free-text book information below
+    book = models.ForeignKey(
+        Book,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reviews'
+    )
+    
     # Book Information
     title = models.CharField(max_length=255)
     author = models.CharField(max_length=255)
@@ -39,6 +63,8 @@ class BookReview(models.Model):
     verified_at = models.DateTimeField(null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = BookReviewQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
         indexes = [
@@ -51,20 +77,33 @@ class BookReview(models.Model):
     def __str__(self):
         return f"{self.title} - {self.student.get_full_name()}"
     
+    def save(self, *args, **kwargs):
+        """Link the catalogue book and emit review_submitted when a new review is created"""
+        adding = self._state.adding
+        if self.book_id is None:
+            self.book_id = book_for(self.title, self.author, self.publisher, self.year_published)
+        super().save(*args, **kwargs)
+        if adding:
+            review_submitted.send(sender=self.__class__, review=self)
+    
     def verify(self, teacher):
         """Mark review as verified"""
+        previous_status = self.status
         self.status = 'verified'
         self.verified_by = teacher
         self.verified_at = timezone.now()
         self.save()
+        review_verified.send(sender=self.__class__, review=self, previous_status=previous_status)
     
     def reject(self, teacher, reason):
         """Reject review with reason"""
+        previous_status = self.status
         self.status = 'rejected'
         self.verified_by = teacher
         self.rejection_reason = reason
         self.verified_at = timezone.now()
         self.save()
+        review_rejected.send(sender=self.__class__, review=self, previous_status=previous_status)
 
 
 class LiteracyPost(models.Model):
@@ -85,6 +124,8 @@ class LiteracyPost(models.Model):
     
     # Engagement
     likes = models.ManyToManyField(User, blank=True, related_name='liked_posts')
+    like_count = models.IntegerField(default=0)
+    comment_count = models.IntegerField(default=0)
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -94,6 +135,9 @@ class LiteracyPost(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['student', 'created_at']),
+            # The forum's keyset orders: (-created_at, -pk) and (-like_count, -pk)
+            models.Index(fields=['-created_at', '-id']),
+            models.Index(fields=['-like_count', '-id']),
         ]
         verbose_name = "Literacy Post"
         verbose_name_plural = "Literacy Posts"
@@ -102,7 +146,23 @@ class LiteracyPost(models.Model):
         return f"{self.title} - {self.student.get_full_name()}"
     
     def get_like_count(self):
-        return self.likes.count()
+        return self.like_count
+    
+    def toggle_like(self, user):
+        """Like or unlike the post for a user and return whether it is now liked"""
+        Like = LiteracyPost.likes.through
+        with transaction.atomic():
+            removed, _ = Like.objects.filter(literacypost=self, user=user).delete()
+            if removed:
+                delta = -1
+            else:
+                _, created = Like.objects.get_or_create(literacypost=self, user=user)
+                delta = int(created)
+            if delta:
+                LiteracyPost.objects.filter(pk=self.pk).update(like_count=F('like_count') + delta)
+        self.refresh_from_db(fields=['like_count'])
+        post_like_toggled.send(sender=self.__class__, post=self, user=user, liked=not removed)
+        return not removed
 
 
 class LiteracyComment(models.Model):
@@ -183,3 +243,32 @@ class LiteracyAchievement(models.Model):
     
     def __str__(self):
         return f"{self.student.get_full_name()} - {self.get_achievement_type_display()}"
+
+
+class MonthlyAmbassador(models.Model):
+    """Top scorer of a class or grade for one month, chosen by the monthly ambassador job"""
+    
+    SCOPE_CHOICES = [
+        ('class', 'By Class'),
+        ('grade', 'By Grade'),
+    ]
+    
+    month = models.DateField(help_text="First day of the month")
+    scope = models.CharField(max_length=20, choices=SCOPE_CHOICES)
+    scope_value = models.CharField(max_length=100, help_text="Class name or grade")
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ambassadorships')
+    total_score = models.IntegerField(default=0, help_text="Score earned during the month")
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-month', 'scope', 'scope_value']
+        constraints = [
+            # Also serves the leaderboard's "latest month" lookup
+            models.UniqueConstraint(fields=['month', 'scope', 'scope_value'], name='unique_monthly_ambassador'),
+        ]
+        verbose_name = "Monthly Ambassador"
+        verbose_name_plural = "Monthly Ambassadors"
+    
+    def __str__(self):
+        return f"{self.student.get_full_name()} - {self.scope_value} ({self.month:%B %Y})"
@@ -0,0 +1,198 @@
+"""
+Forum full-text search
+Posts are indexed in literacy_post_search (created by migration 0003): an
+FTS5 virtual table on SQLite, or a tsvector table with a GIN index on
+PostgreSQL. The index is kept in
+sync by the post save/delete receivers below, and by a User save receiver for
+the author names, and can be rebuilt with the rebuild_forum_search command.
+Other databases fall back to icontains. Both backends highlight matches in
+the post content only.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import LiteracyPost
+
+
+SEARCH_TABLE = 'literacy_post_search'
+SNIPPET_WORDS = 16
+
+# Highlight markers placed around matches by the database and turned into
+# <mark> tags only after the snippet has been HTML-escaped
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+
+
+# Copy posts, with their author's name, into the index; followed by a WHERE
+# clause on the post (p) selecting which ones
+INDEX_SQL = {
+    'sqlite': (
+        f"INSERT INTO {SEARCH_TABLE} (rowid, title, content, author) "
+        "SELECT p.id, p.title, p.content, TRIM(u.first_name || ' ' || u.last_name) "
+        "FROM literacy_literacypost p JOIN auth_user u ON u.id = p.student_id "
+    ),
+    'postgresql': (
+        f"INSERT INTO {SEARCH_TABLE} (post_id, document) "
+        "SELECT p.id, "
+        "setweight(to_tsvector('simple', p.title), 'A') || "
+        "setweight(to_tsvector('simple', p.content), 'B') || "
+        "setweight(to_tsvector('simple', u.first_name || ' ' || u.last_name), 'C') "
+        "FROM literacy_literacypost p JOIN auth_user u ON u.id = p.student_id "
+    ),
+}
+KEY_COLUMN = {'sqlite': 'rowid', 'postgresql': 'post_id'}
+# Position of the content column in the SQLite table, for snippet()
+CONTENT_COLUMN = 1
+
+
+def search_supported():
+    return connection.vendor in INDEX_SQL
+
+
+def _unindex(cursor, first_pk, last_pk):
+    cursor.execute(
+        f'DELETE FROM {SEARCH_TABLE} WHERE {KEY_COLUMN[connection.vendor]} BETWEEN %s AND %s',
+        [first_pk, last_pk]
+    )
+
+
+def index_posts(first_pk, last_pk):
+    """Replace the search entries of posts first_pk..last_pk (inclusive)"""
+    if not search_supported():
+        return
+    with connection.cursor() as cursor:
+        _unindex(cursor, first_pk, last_pk)
+        cursor.execute(INDEX_SQL[connection.vendor] + 'WHERE p.id BETWEEN %s AND %s', [first_pk, last_pk])
+
+
+def index_author_posts(user_id):
+    """Replace the search entries of every post by one author, e.g. after a rename"""
+    if not search_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE {KEY_COLUMN[connection.vendor]} IN '
+            '(SELECT id FROM literacy_literacypost WHERE student_id = %s)',
+            [user_id]
+        )
+        cursor.execute(INDEX_SQL[connection.vendor] + 'WHERE p.student_id = %s', [user_id])
+
+
+def unindex_posts(first_pk, last_pk):
+    if not search_supported():
+        return
+    with connection.cursor() as cursor:
+        _unindex(cursor, first_pk, last_pk)
+
+
+def rebuild_search_index(batch_size=1000):
+    """Re-index every post, `batch_size` posts per statement, and return the number indexed"""
+    if not search_supported():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+
+    indexed = 0
+    last_pk = 0
+    while True:
+        batch_pks = list(
+            LiteracyPost.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not batch_pks:
+            return indexed
+        index_posts(batch_pks[0], batch_pks[-1])
+        indexed += len(batch_pks)
+        last_pk = batch_pks[-1]
+
+
+def on_post_saved(sender, instance, **kwargs):
+    index_posts(instance.pk, instance.pk)
+
+
+def on_post_deleted(sender, instance, **kwargs):
+    unindex_posts(instance.pk, instance.pk)
+
+
+def on_user_saved(sender, instance, created=False, update_fields=None, **kwargs):
+    # Logins save last_login only; a new user has no posts yet
+    if created or (update_fields is not None and not {'first_name', 'last_name'} & set(update_fields)):
+        return
+    index_author_posts(instance.pk)
+
+
+def _terms(query):
+    return re.findall(r'\w+', query.lower())
+
+
+def _highlight(snippet):
+    return mark_safe(
+        escape(snippet).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+    )
+
+
+def search_posts(query, page=1, per_page=20, queryset=None):
+    """
+    Return (posts, has_next) for one page of the posts in `queryset` that
+    match `query`, best match first. Each post carries a `snippet` with the
+    matched terms wrapped in <mark>, or None without a search index.
+    """
+    if queryset is None:
+        queryset = LiteracyPost.objects.all()
+    terms = _terms(query)
+    if not terms:
+        return [], False
+    offset = (page - 1) * per_page
+
+    if not search_supported():
+        posts = list(
+            queryset.filter(
+                Q(title__icontains=query) |
+                Q(content__icontains=query) |
+                Q(student__first_name__icontains=query) |
+                Q(student__last_name__icontains=query)
+            ).order_by('-created_at', '-pk')[offset:offset + per_page + 1]
+        )
+        for post in posts:
+            post.snippet = None
+        return posts[:per_page], len(posts) > per_page
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            # Every term must match, as a prefix so partial words still find posts
+            match = ' '.join(f'"{term}"*' for term in terms)
+            cursor.execute(
+                f'SELECT rowid, snippet({SEARCH_TABLE}, {CONTENT_COLUMN}, %s, %s, %s, %s) '
+                f'FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s '
+                f'ORDER BY bm25({SEARCH_TABLE}, 10.0, 5.0, 1.0), rowid DESC LIMIT %s OFFSET %s',
+                [_MARK_START, _MARK_END, '…', SNIPPET_WORDS, match, per_page + 1, offset]
+            )
+        else:
+            match = ' & '.join(f'{term}:*' for term in terms)
+            cursor.execute(
+                f"SELECT s.post_id, ts_headline('simple', p.content, q.query, %s) "
+                f"FROM {SEARCH_TABLE} s "
+                "JOIN literacy_literacypost p ON p.id = s.post_id, "
+                "to_tsquery('simple', %s) AS q(query) "
+                "WHERE s.document @@ q.query "
+                "ORDER BY ts_rank(s.document, q.query) DESC, s.post_id DESC LIMIT %s OFFSET %s",
+                [
+                    f'StartSel={_MARK_START}, StopSel={_MARK_END}, MaxWords={SNIPPET_WORDS}, MinWords=5',
+                    match, per_page + 1, offset,
+                ]
+            )
+        hits = cursor.fetchall()
+
+    has_next = len(hits) > per_page
+    hits = hits[:per_page]
+    posts = queryset.in_bulk([pk for pk, _ in hits])
+    results = []
+    for pk, snippet in hits:
+        post = posts.get(pk)
+        if post is not None:
+            post.snippet = _highlight(snippet or '')
+            results.append(post)
+    return results, has_next
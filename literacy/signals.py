@@ -0,0 +1,18 @@
+"""
+Domain events for book reviews and forum posts
+Review receivers get the review instance and the status it had before the event
+"""
+from django.dispatch import Signal
+
+
+# Sent after a student submits a new review
+review_submitted = Signal()
+
+# Sent after a teacher verifies a review (kwargs: review, previous_status)
+review_verified = Signal()
+
+# Sent after a teacher rejects a review (kwargs: review, previous_status)
+review_rejected = Signal()
+
+# Sent after a user likes or unlikes a post (kwargs: post, user, liked)
+post_like_toggled = Signal()
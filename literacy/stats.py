@@ -0,0 +1,38 @@
+"""
+Per-student review statistics
+The status counts behind the review, leaderboard and check-in pages come from
+a single conditional-aggregation query and are cached per user until one of
+the user's reviews is saved or deleted.
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import BookReview
+
+
+REVIEW_STATS_TIMEOUT = 60 * 60
+
+
+def _cache_key(user_id):
+    return f'literacy:review_stats:{user_id}'
+
+
+def get_review_stats(user):
+    """Return {'total', 'pending', 'verified', 'rejected'} review counts for a user"""
+    key = _cache_key(user.pk)
+    stats = cache.get(key)
+    if stats is None:
+        stats = BookReview.objects.filter(student=user).status_counts()
+        cache.set(key, stats, REVIEW_STATS_TIMEOUT)
+    return stats
+
+
+def invalidate_review_stats(user_id):
+    """Drop a user's cached counts now and again once the transaction commits"""
+    key = _cache_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def on_review_changed(sender, instance, **kwargs):
+    invalidate_review_stats(instance.student_id)
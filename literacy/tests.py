@@ -1,3 +1,548 @@
 from django.test import TestCase
+from django.db.models import Count
+from io import StringIO
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
 
-# Create your tests here.
+from .models import BookReview, LiteracyLeaderboard, LiteracyPost, LiteracyComment, LiteracyAchievement, MonthlyAmbassador
+from .leaderboard import recalculate_leaderboard, get_rank_window, leaderboard_version, apply_score_delta
+from .stats import get_review_stats
+from .ambassadors import select_monthly_ambassadors, latest_ambassadors
+from .achievements import award_achievements
+from .engagement import repair_post_counters
+from .search import search_posts, rebuild_search_index
+from .views import FORUM_PAGE_SIZE
+from authentication.models import UserProfile
+
+
+def create_student(username, kelas='X 1'):
+    user = User.objects.create_user(username=username)
+    UserProfile.objects.create(user=user, role='student', nis=username, kelas=kelas)
+    return user
+
+
+def create_review(student, status='pending'):
+    return BookReview.objects.create(
+        student=student,
+        title='Laskar Pelangi',
+        author='Andrea Hirata',
+        publisher='Bentang Pustaka',
+        year_published=2005,
+        summary='A story about ten children in Belitung.',
+        status=status,
+    )
+
+
+class LeaderboardRecalculationTests(TestCase):
+
+    def test_scores_and_ranks(self):
+        top = create_student('1001')
+        tied = create_student('1002')
+        other = create_student('1003', kelas='XI 2')
+        for student in [top, top, tied, other]:
+            create_review(student, status='verified')
+
+        summary = recalculate_leaderboard()
+
+        self.assertEqual(summary['students'], 3)
+        school = LiteracyLeaderboard.objects.get(student=top, scope='school')
+        self.assertEqual((school.total_score, school.rank), (60, 1))
+        self.assertEqual(
+            list(LiteracyLeaderboard.objects.filter(scope='school').values_list('rank', flat=True)),
+            [1, 2, 2]
+        )
+        self.assertEqual(LiteracyLeaderboard.objects.get(student=other, scope='class').rank, 1)
+        self.assertEqual(
+            list(LiteracyLeaderboard.objects.filter(scope='grade', scope_value='X').values_list('rank', flat=True)),
+            [1, 2]
+        )
+
+    def test_query_count_is_constant(self):
+        for i in range(3):
+            create_review(create_student(f'20{i}'), status='verified')
+        # Including the windowed query that pre-renders every scope's first page
+        with self.assertNumQueries(10):
+            recalculate_leaderboard()
+
+        for i in range(20):
+            create_review(create_student(f'30{i}', kelas=f'X {i}'))
+        with self.assertNumQueries(10):
+            recalculate_leaderboard()
+
+    def test_removes_stale_rows(self):
+        student = create_student('4001', kelas='X 1')
+        recalculate_leaderboard()
+        UserProfile.objects.filter(user=student).update(kelas='XI 1')
+
+        recalculate_leaderboard()
+
+        self.assertEqual(
+            set(LiteracyLeaderboard.objects.values_list('scope_value', flat=True)),
+            {'school', 'XI', 'XI 1'}
+        )
+
+
+class RankWindowTests(TestCase):
+
+    def test_window_around_student(self):
+        students = [create_student(f'50{i:02d}') for i in range(20)]
+        for i, student in enumerate(students):
+            for _ in range(i):
+                create_review(student, status='verified')
+        recalculate_leaderboard()
+
+        window = get_rank_window(students[10], 'school', 'school')
+
+        self.assertEqual(window['rank'], 10)
+        self.assertEqual([entry.rank for entry in window['above']], [5, 6, 7, 8, 9])
+        self.assertEqual([entry.rank for entry in window['below']], [11, 12, 13, 14, 15])
+        self.assertIsNone(get_rank_window(students[0], 'class', 'XII 9'))
+
+
+class LeaderboardEventTests(TestCase):
+    """Review events keep scores in step with a full recalculation"""
+
+    def test_events_match_recalculation(self):
+        teacher = User.objects.create_user(username='guru')
+        student = create_student('6001')
+        first = create_review(student)
+        second = create_review(student)
+        first.verify(teacher)
+        second.reject(teacher, 'Summary too short')
+
+        entry = LiteracyLeaderboard.objects.get(student=student, scope='class')
+        self.assertEqual((entry.books_read, entry.consistency_score, entry.total_score), (1, 20, 40))
+        self.assertEqual(recalculate_leaderboard(dry_run=True)['drift'], [])
+
+    def test_score_delta_only_touches_the_students_rows(self):
+        students = [create_student(f'61{i:02d}') for i in range(10)]
+        for student in students:
+            create_review(student, status='verified')
+        recalculate_leaderboard()
+        last = User.objects.select_related('profile').get(pk=students[-1].pk)
+
+        # One insert for missing rows, the 30-day count and one F() update; on
+        # commit only the scopes' cache versions move, without re-ranking
+        with self.captureOnCommitCallbacks() as callbacks, self.assertNumQueries(3):
+            apply_score_delta(last, verified=5)
+        self.assertEqual(len(callbacks), 1)
+        with self.assertNumQueries(0):
+            callbacks[0]()
+
+        window = get_rank_window(last, 'school', 'school')
+        self.assertEqual(window['rank'], 1)
+        self.assertEqual([entry.rank for entry in window['below']], [2, 2, 2, 2, 2])
+        self.assertEqual(LiteracyLeaderboard.objects.get(student=last, scope='school').rank, 1)
+
+    def test_consistency_score_leaves_the_window(self):
+        teacher = User.objects.create_user(username='guru')
+        student = create_student('6003')
+        old, new = create_review(student), create_review(student)
+        BookReview.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=31))
+
+        # The next event recounts the window: the old submission no longer counts
+        new.verify(teacher)
+
+        entry = LiteracyLeaderboard.objects.get(student=student, scope='school')
+        self.assertEqual((entry.consistency_score, entry.total_score), (10, 30))
+        self.assertEqual(recalculate_leaderboard(dry_run=True)['drift'], [])
+
+    def test_reports_drift(self):
+        student = create_student('6002')
+        create_review(student, status='verified')
+        LiteracyLeaderboard.objects.filter(student=student, scope='school').update(
+            books_read=7, consistency_score=0, total_score=999
+        )
+
+        drift = recalculate_leaderboard()['drift']
+
+        self.assertEqual(
+            [(row['scope'], row['stored_score'], row['expected_score']) for row in drift],
+            [('school', 999, 30)]
+        )
+        self.assertEqual(
+            list(LiteracyLeaderboard.objects.filter(student=student).values_list(
+                'scope', 'books_read', 'verified_reviews', 'consistency_score', 'total_score', 'rank'
+            ).order_by('scope')),
+            [('class', 1, 1, 10, 30, 1), ('grade', 1, 1, 10, 30, 1), ('school', 1, 1, 10, 30, 1)]
+        )
+        self.assertEqual(recalculate_leaderboard()['drift'], [])
+
+
+class LeaderboardPageTests(TestCase):
+    """Leaderboard pages are rendered when scores change, not when viewed"""
+
+    def setUp(self):
+        cache.clear()
+        self.student = create_student('6101')
+        self.rival = create_student('6102')
+        User.objects.filter(pk=self.rival.pk).update(first_name='Rival')
+        create_review(self.rival, status='verified')
+        recalculate_leaderboard()
+        self.client.force_login(self.student)
+
+    def test_page_served_from_fragment_cache(self):
+        with mock.patch('literacy.leaderboard.keyset_paginate') as paginate:
+            response = self.client.get(reverse('literacy:leaderboard'))
+        paginate.assert_not_called()
+        self.assertContains(response, 'data-student="%d"' % self.rival.pk)
+        self.assertEqual(response.context['user_rank'], 2)
+
+    def test_user_on_page_with_tied_ranks(self):
+        # 101 more students tied on 0 points all share rank 2, but the page
+        # (ordered by score, then newest row) has room for only 99 of them
+        users = User.objects.bulk_create([User(username=f'62{i:03d}') for i in range(101)])
+        UserProfile.objects.bulk_create([
+            UserProfile(user=user, role='student', nis=user.username, kelas='X 1') for user in users
+        ])
+        recalculate_leaderboard()
+
+        for student, on_page in [(self.student, False), (users[-1], True)]:
+            self.client.force_login(student)
+            with mock.patch('literacy.leaderboard.keyset_paginate') as paginate:
+                response = self.client.get(reverse('literacy:leaderboard'))
+            paginate.assert_not_called()
+            self.assertEqual(response.context['user_rank'], 2)
+            self.assertEqual(response.context['user_on_page'], on_page)
+
+    def test_review_events_refresh_the_page(self):
+        version = leaderboard_version('school', 'school')
+        teacher = User.objects.create_user(username='guru')
+        for review in [create_review(self.student), create_review(self.student)]:
+            with self.captureOnCommitCallbacks(execute=True):
+                review.verify(teacher)
+        self.assertNotEqual(leaderboard_version('school', 'school'), version)
+
+        # Recomputed on view with ranks counted on read, before any recalculation
+        response = self.client.get(reverse('literacy:leaderboard'), {'scope': 'class'})
+        content = response.content.decode()
+        self.assertLess(
+            content.index('data-student="%d"' % self.student.pk),
+            content.index('data-student="%d"' % self.rival.pk)
+        )
+        self.assertEqual([entry.rank for entry in response.context['leaderboard']], [1, 2])
+        self.assertEqual(response.context['user_rank'], 1)
+        self.assertTrue(response.context['user_on_page'])
+
+
+class MonthlyAmbassadorTests(TestCase):
+
+    def setUp(self):
+        self.month = timezone.localdate().replace(day=1)
+        self.leader = create_student('6201', kelas='X 1')
+        self.runner_up = create_student('6202', kelas='X 1')
+        self.other_class = create_student('6203', kelas='X 2')
+        for student, verified in [(self.leader, 2), (self.runner_up, 1), (self.other_class, 1)]:
+            for _ in range(verified):
+                create_review(student, status='verified')
+        BookReview.objects.update(verified_at=timezone.now())
+        # Reviews from earlier months do not count
+        BookReview.objects.filter(student=self.other_class).update(
+            created_at=timezone.now() - timedelta(days=62), verified_at=timezone.now() - timedelta(days=62)
+        )
+        recalculate_leaderboard()
+
+    def test_top_scorer_per_class_and_grade(self):
+        # One windowed query picks every winner; the rest are bulk writes
+        with self.assertNumQueries(9):
+            ambassadors = select_monthly_ambassadors(self.month)
+
+        self.assertEqual(
+            [(a.scope, a.scope_value, a.student_id, a.total_score) for a in ambassadors],
+            [('class', 'X 1', self.leader.pk, 60), ('grade', 'X', self.leader.pk, 60)]
+        )
+        self.assertEqual(
+            set(LiteracyLeaderboard.objects.filter(is_monthly_ambassador=True).values_list('scope', 'student')),
+            {('class', self.leader.pk), ('grade', self.leader.pk)}
+        )
+        self.assertTrue(LiteracyAchievement.objects.filter(student=self.leader, achievement_type='ambassador').exists())
+
+    def test_rerun_replaces_selection(self):
+        select_monthly_ambassadors(self.month)
+        for _ in range(3):
+            create_review(self.runner_up, status='verified')
+        BookReview.objects.filter(verified_at__isnull=True).update(verified_at=timezone.now())
+
+        select_monthly_ambassadors(self.month)
+
+        self.assertEqual(MonthlyAmbassador.objects.filter(month=self.month).count(), 2)
+        with self.assertNumQueries(1):
+            winners = {(a.scope, a.student.username) for a in latest_ambassadors()}
+        self.assertEqual(winners, {('class', '6202'), ('grade', '6202')})
+        self.assertEqual(LiteracyAchievement.objects.filter(achievement_type='ambassador').count(), 2)
+
+
+class AchievementTests(TestCase):
+
+    def achievements(self, student):
+        return set(student.literacy_achievements.values_list('achievement_type', flat=True))
+
+    def test_batch_run_awards_each_rule_once(self):
+        reader = create_student('6301')
+        newcomer = create_student('6302')
+        for _ in range(5):
+            create_review(reader, status='verified')
+        create_review(newcomer, status='verified')
+        create_review(create_student('6303'))
+
+        # One query per rule plus one insert per rule with new awards
+        with self.assertNumQueries(4 + 2):
+            report = award_achievements()
+
+        self.assertEqual({rule: result['awarded'] for rule, result in report.items()}, {
+            'first_review': 2, 'five_books': 1, 'ten_books': 0, 'consistent_reader': 0,
+        })
+        self.assertEqual(self.achievements(reader), {'first_review', 'five_books'})
+        self.assertEqual(self.achievements(newcomer), {'first_review'})
+        self.assertEqual(sum(result['awarded'] for result in award_achievements().values()), 0)
+
+    def test_report_counts_only_new_awards(self):
+        veteran = create_student('6306')
+        reader = create_student('6307')
+        for student in [veteran, reader]:
+            for _ in range(3):
+                create_review(student, status='verified')
+        LiteracyAchievement.objects.create(student=veteran, achievement_type='first_review')
+
+        # Several qualifying reviews per student, one of whom already has the badge
+        report = award_achievements(rules=['first_review'])
+        self.assertEqual(report['first_review']['awarded'], 1)
+        self.assertEqual(LiteracyAchievement.objects.filter(achievement_type='first_review').count(), 2)
+
+        self.assertEqual(award_achievements(rules=['first_review'])['first_review']['awarded'], 0)
+        self.assertEqual(award_achievements(reader.pk)['first_review']['awarded'], 0)
+
+    def test_consistent_reader(self):
+        student = create_student('6304')
+        doubtful = create_student('6308')
+        for weeks_ago in range(4):
+            # The other student's last week was rejected, so only 3 weeks count
+            for reader, status in [(student, 'verified'), (doubtful, 'rejected' if weeks_ago == 0 else 'verified')]:
+                review = create_review(reader, status=status)
+                BookReview.objects.filter(pk=review.pk).update(
+                    created_at=timezone.now() - timedelta(weeks=weeks_ago, hours=1)
+                )
+        create_review(doubtful)
+
+        award_achievements(rules=['consistent_reader'])
+        self.assertEqual(self.achievements(student), {'consistent_reader'})
+        self.assertEqual(self.achievements(doubtful), set())
+
+    def test_verifying_a_review_awards_incrementally(self):
+        student = create_student('6305')
+        review = create_review(student)
+        with self.captureOnCommitCallbacks(execute=True):
+            review.verify(User.objects.create_user(username='guru'))
+        self.assertEqual(self.achievements(student), {'first_review'})
+
+
+class ReviewStatsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_counts_in_one_query_and_cached(self):
+        student = create_student('7001')
+        create_review(student)
+        create_review(student, status='verified')
+        create_review(student, status='rejected')
+
+        with self.assertNumQueries(1):
+            stats = get_review_stats(student)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_review_stats(student), stats)
+        self.assertEqual(stats, {'total': 3, 'pending': 1, 'verified': 1, 'rejected': 1})
+
+    def test_saving_a_review_invalidates_cache(self):
+        teacher = User.objects.create_user(username='guru')
+        student = create_student('7002')
+        review = create_review(student)
+        self.assertEqual(get_review_stats(student)['pending'], 1)
+
+        review.verify(teacher)
+        self.assertEqual(get_review_stats(student)['verified'], 1)
+        review.delete()
+        self.assertEqual(get_review_stats(student)['total'], 0)
+
+
+class ForumViewTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.student = create_student('8001')
+        self.client.force_login(self.student)
+
+    def create_posts(self, count):
+        for i in range(count):
+            post = LiteracyPost.objects.create(student=self.student, title=f'Post {i}', content='...')
+            post.toggle_like(self.student)
+            LiteracyComment.objects.create(post=post, student=self.student, content='Nice')
+
+    def forum_queries(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('literacy:forum'), params)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_query_count_does_not_grow_with_posts(self):
+        # Warm the per-user profile cache so both requests hit it
+        self.forum_queries()
+        self.create_posts(2)
+        _, few = self.forum_queries()
+        self.create_posts(10)
+        _, many = self.forum_queries()
+        self.assertEqual(few, many)
+
+    def test_annotations_and_pages(self):
+        self.create_posts(FORUM_PAGE_SIZE + 1)
+        response, _ = self.forum_queries(sort='popular')
+        posts = response.context['posts']
+        self.assertEqual(len(posts), FORUM_PAGE_SIZE)
+        self.assertEqual({(p.like_count, p.comment_count, p.user_liked) for p in posts}, {(1, 1, True)})
+
+        response, _ = self.forum_queries(sort='popular', cursor=posts.next_cursor)
+        last_page = response.context['posts']
+        self.assertEqual(len(last_page), 1)
+        self.assertFalse(last_page.has_next)
+        self.assertNotIn(last_page.object_list[0].pk, [p.pk for p in posts])
+
+    def test_listing_is_cached_until_a_post_changes(self):
+        self.create_posts(1)
+        _, missed = self.forum_queries()
+        _, hit = self.forum_queries()
+        self.assertLess(hit, missed)
+
+        post = LiteracyPost.objects.get()
+        post.toggle_like(self.student)
+        response, _ = self.forum_queries()
+        self.assertEqual([(p.like_count, p.user_liked) for p in response.context['posts']], [(0, False)])
+
+
+class PostCounterTests(TestCase):
+
+    def test_counters_follow_likes_and_comments(self):
+        student = create_student('9001')
+        other = create_student('9002')
+        post = LiteracyPost.objects.create(student=student, title='Bumi', content='...')
+
+        self.assertTrue(post.toggle_like(student))
+        self.assertTrue(post.toggle_like(other))
+        self.assertFalse(post.toggle_like(student))
+        comment = LiteracyComment.objects.create(post=post, student=other, content='Setuju')
+        LiteracyComment.objects.create(post=post, student=student, content='Terima kasih')
+        comment.delete()
+
+        post.refresh_from_db()
+        self.assertEqual((post.like_count, post.comment_count), (1, 1))
+        self.assertEqual(repair_post_counters(), 0)
+
+    def test_repair_recounts_drifted_posts(self):
+        student = create_student('9003')
+        posts = [
+            LiteracyPost.objects.create(student=student, title=f'Post {i}', content='...')
+            for i in range(3)
+        ]
+        posts[0].likes.add(student)
+        LiteracyPost.objects.filter(pk=posts[2].pk).update(comment_count=7)
+
+        self.assertEqual(repair_post_counters(batch_size=2, dry_run=True), 2)
+        self.assertEqual(repair_post_counters(batch_size=2), 2)
+        self.assertEqual(
+            list(LiteracyPost.objects.order_by('pk').values_list('like_count', 'comment_count')),
+            [(1, 0), (0, 0), (0, 0)]
+        )
+
+
+class ForumSearchTests(TestCase):
+
+    def setUp(self):
+        self.student = create_student('9101')
+        self.student.first_name = 'Siti'
+        self.student.save()
+
+    def post(self, title, content):
+        return LiteracyPost.objects.create(student=self.student, title=title, content=content)
+
+    def test_ranked_results_with_escaped_snippets(self):
+        in_content = self.post('Catatan', 'Akhirnya selesai membaca <b>Pelangi</b> minggu ini')
+        in_title = self.post('Laskar Pelangi', 'Buku favorit saya')
+        self.post('Bumi Manusia', 'Novel sejarah')
+
+        posts, has_next = search_posts('pelang')
+
+        self.assertEqual([post.pk for post in posts], [in_title.pk, in_content.pk])
+        self.assertFalse(has_next)
+        self.assertIn('&lt;b&gt;<mark>Pelangi</mark>&lt;/b&gt;', posts[1].snippet)
+
+    def test_index_follows_edits_and_deletes(self):
+        post = self.post('Ronggeng', 'Dukuh Paruk')
+        self.assertEqual(len(search_posts('siti')[0]), 1)
+
+        post.title = 'Perahu Kertas'
+        post.save()
+        self.assertEqual(search_posts('ronggeng')[0], [])
+        self.assertEqual(len(search_posts('perahu kertas')[0]), 1)
+
+        post.delete()
+        self.assertEqual(search_posts('perahu')[0], [])
+
+    def test_index_follows_author_renames(self):
+        post = self.post('Ronggeng', 'Dukuh Paruk')
+        self.client.force_login(self.student)  # saves last_login only
+
+        self.student.first_name = 'Sri'
+        self.student.save()
+
+        self.assertEqual(search_posts('siti')[0], [])
+        self.assertEqual([p.pk for p in search_posts('sri')[0]], [post.pk])
+
+    def test_snippets_come_from_the_content(self):
+        self.post('Laskar Pelangi', 'Buku favorit saya')
+
+        posts, _ = search_posts('pelangi')
+
+        self.assertEqual(str(posts[0].snippet), 'Buku favorit saya')
+
+    def test_rebuild_and_paging(self):
+        for i in range(FORUM_PAGE_SIZE + 1):
+            self.post(f'Resensi {i}', 'Cerita rakyat')
+        self.assertEqual(rebuild_search_index(batch_size=7), FORUM_PAGE_SIZE + 1)
+
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('literacy:forum'), {'q': 'cerita'})
+        self.assertEqual(len(response.context['posts']), FORUM_PAGE_SIZE)
+        self.assertEqual(response.context['next_page'], 2)
+        response = self.client.get(reverse('literacy:forum'), {'q': 'cerita', 'page': 2})
+        self.assertEqual(len(response.context['posts']), 1)
+        self.assertIsNone(response.context['next_page'])
+
+
+class ReviewBookTests(TestCase):
+
+    def test_new_reviews_are_linked_to_a_book(self):
+        first = create_review(create_student('9201'))
+        second = create_review(create_student('9202'))
+        self.assertIsNotNone(first.book_id)
+        self.assertEqual(first.book_id, second.book_id)
+
+    def test_backfill_clusters_existing_reviews(self):
+        student = create_student('9203')
+        for title in ['Laskar Pelangi', 'laskar pelangi', 'Sang Pemimpi']:
+            review = create_review(student)
+            BookReview.objects.filter(pk=review.pk).update(title=title, book=None)
+
+        call_command('backfill_review_books', batch_size=2, stdout=StringIO())
+
+        self.assertFalse(BookReview.objects.filter(book__isnull=True).exists())
+        per_book = BookReview.objects.values('book__title').annotate(reviews=Count('id')).order_by('book__title')
+        self.assertEqual(
+            [(row['book__title'], row['reviews']) for row in per_book],
+            [('Laskar Pelangi', 2), ('Sang Pemimpi', 1)]
+        )
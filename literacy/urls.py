@@ -11,6 +11,7 @@ urlpatterns = [
     
     # Leaderboard
     path('leaderboard/', views.leaderboard_view, name='leaderboard'),
+    path('leaderboard/rank/', views.rank_lookup_view, name='rank_lookup'),
     
     # Teacher Verification
     path('teacher/verify/', views.teacher_verify_reviews_view, name='teacher_verify_reviews'),
@@ -2,30 +2,30 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.views.decorators.http import require_http_methods
-from django.http import JsonResponse, HttpResponseForbidden
-from django.db.models import Q, Count, Sum, Avg
+from django.http import JsonResponse, HttpResponseForbidden, Http404
+from django.db.models import Exists, OuterRef
 from django.utils import timezone
-from datetime import datetime, timedelta
-import json
 
-from .models import BookReview, LiteracyPost, LiteracyComment, LiteracyLeaderboard, LiteracyAchievement
+from .models import BookReview, LiteracyPost, LiteracyComment
 from .forms import BookReviewForm, LiteracyPostForm, CommentForm, ReviewVerificationForm
+from .leaderboard import (
+    recalculate_leaderboard, resolve_scope, get_rank_window, leaderboard_page_context,
+)
+from .stats import get_review_stats
+from .ambassadors import latest_ambassadors
+from .search import search_posts
+from .engagement import get_forum_page, mark_liked
 from authentication.models import UserProfile
+from authentication.decorators import role_required, student_required
+
+
+FORUM_PAGE_SIZE = 20
 
 
 @login_required
+@student_required(message="Only students can submit book reviews.", redirect_to='literacy:leaderboard')
 def submit_review_view(request):
     """Student submits a book review"""
-    try:
-        user_profile = UserProfile.objects.get(user=request.user)
-    except UserProfile.DoesNotExist:
-        # Create a default profile for user if doesn't exist
-        user_profile = UserProfile.objects.create(user=request.user, role='student')
-    
-    if not user_profile.is_student():
-        messages.error(request, "Only students can submit book reviews.")
-        return redirect('literacy:leaderboard')
-    
     if request.method == 'POST':
         form = BookReviewForm(request.POST)
         if form.is_valid():
@@ -42,17 +42,15 @@ def submit_review_view(request):
         form = BookReviewForm()
     
     # Get user stats for gamification
+    review_stats = get_review_stats(request.user)
     stats = {
-        'reviews_count': BookReview.objects.filter(student=request.user).count(),
-        'verified_count': BookReview.objects.filter(
-            student=request.user,
-            status='verified'
-        ).count(),
+        'reviews_count': review_stats['total'],
+        'verified_count': review_stats['verified'],
     }
     
     context = {
         'form': form,
-        'user_profile': user_profile,
+        'user_profile': request.profile,
         'stats': stats,
     }
     
@@ -60,17 +58,9 @@ def submit_review_view(request):
 
 
 @login_required
+@student_required(redirect_to='literacy:leaderboard')
 def my_reviews_view(request):
     """Student views their review history"""
-    try:
-        user_profile = UserProfile.objects.get(user=request.user)
-    except UserProfile.DoesNotExist:
-        # Create a default profile for user if doesn't exist
-        user_profile = UserProfile.objects.create(user=request.user, role='student')
-    
-    if not user_profile.is_student():
-        return redirect('literacy:leaderboard')
-    
     # Get all reviews - use distinct to avoid duplicates
     reviews = BookReview.objects.filter(student=request.user).distinct()
     
@@ -79,15 +69,13 @@ def my_reviews_view(request):
     if status_filter in ['pending', 'verified', 'rejected']:
         reviews = reviews.filter(status=status_filter)
     
-    # Get all reviews count before filtering for stats
-    all_reviews_count = BookReview.objects.filter(student=request.user).count()
-    
-    # Stats
+    # Stats over all reviews, before filtering
+    review_stats = get_review_stats(request.user)
     stats = {
-        'total_reviews': all_reviews_count,
-        'pending_reviews': BookReview.objects.filter(student=request.user, status='pending').count(),
-        'verified_reviews': BookReview.objects.filter(student=request.user, status='verified').count(),
-        'rejected_reviews': BookReview.objects.filter(student=request.user, status='rejected').count(),
+        'total_reviews': review_stats['total'],
+        'pending_reviews': review_stats['pending'],
+        'verified_reviews': review_stats['verified'],
+        'rejected_reviews': review_stats['rejected'],
     }
     
     context = {
@@ -118,59 +106,47 @@ def review_detail_view(request, pk):
 @login_required
 def leaderboard_view(request):
     """Display leaderboard with different scopes"""
-    user_profile = get_object_or_404(UserProfile, user=request.user)
+    user_profile = request.profile
+    if not user_profile:
+        raise Http404("No profile for this user.")
     
     # Get scope from request
-    scope = request.GET.get('scope', 'school')  # school, class, or grade
-    
-    # Get leaderboard data
-    if scope == 'class' and user_profile.kelas:
-        leaderboard = LiteracyLeaderboard.objects.filter(
-            scope_value=user_profile.kelas
-        ).order_by('-total_score')[:100]
-    elif scope == 'grade':
-        grade = user_profile.kelas.split()[0] if user_profile.kelas else 'X'
-        leaderboard = LiteracyLeaderboard.objects.filter(
-            scope_value=grade
-        ).order_by('-total_score')[:100]
-    else:  # school-wide
-        leaderboard = LiteracyLeaderboard.objects.filter(
-            scope_value='school'
-        ).order_by('-total_score')[:100]
-    
-    # Add rank
-    for idx, entry in enumerate(leaderboard, 1):
-        entry.rank = idx
-    
-    # Get current user's rank
+    scope, scope_value = resolve_scope(user_profile, request.GET.get('scope', 'school'))
+    
+    # The page itself comes pre-rendered from the fragment cache
+    cursor = request.GET.get('cursor')
+    
+    # Get current user's rank and neighbours
     user_rank = None
+    rank_window = None
     if user_profile.is_student():
-        try:
-            user_entry = next(
-                (e for e in leaderboard if e.student_id == request.user.id),
-                None
-            )
-            if user_entry:
-                user_rank = user_entry.rank
-        except:
-            pass
+        rank_window = get_rank_window(request.user, scope, scope_value)
+        if rank_window:
+            user_rank = rank_window['rank']
     
     # Get user's stats
+    review_stats = get_review_stats(request.user)
     user_stats = {
-        'books_read': BookReview.objects.filter(student=request.user, status='verified').count(),
-        'pending_reviews': BookReview.objects.filter(student=request.user, status='pending').count(),
-        'total_reviews': BookReview.objects.filter(student=request.user).count(),
+        'books_read': review_stats['verified'],
+        'verified_reviews': review_stats['verified'],
+        'pending_reviews': review_stats['pending'],
+        'total_reviews': review_stats['total'],
     }
     
-    # Get monthly ambassador
-    ambassadors = LiteracyLeaderboard.objects.filter(
-        is_monthly_ambassador=True
-    ).order_by('scope_value')
+    # Latest monthly ambassadors, chosen by the monthly job
+    ambassadors = latest_ambassadors()
+    
+    # Tied ranks can run past the first page, so look for the student on it
+    page_context = leaderboard_page_context(scope, scope_value, cursor)
+    user_on_page = bool(not cursor and rank_window) and any(
+        entry.student_id == request.user.id for entry in page_context['leaderboard']
+    )
     
     context = {
-        'leaderboard': leaderboard,
-        'scope': scope,
+        **page_context,
         'user_rank': user_rank,
+        'rank_window': rank_window,
+        'user_on_page': user_on_page,
         'user_stats': user_stats,
         'user_profile': user_profile,
         'ambassadors': ambassadors,
@@ -180,13 +156,43 @@ def leaderboard_view(request):
 
 
 @login_required
+def rank_lookup_view(request):
+    """JSON rank lookup: a student's rank and neighbours in a leaderboard scope"""
+    try:
+        student_id = int(request.GET.get('student', request.user.id))
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid student'}, status=400)
+    student_profile = get_object_or_404(UserProfile.objects.select_related('user'), user_id=student_id)
+    scope, scope_value = resolve_scope(student_profile, request.GET.get('scope', 'school'))
+    
+    rank_window = get_rank_window(student_profile.user, scope, scope_value)
+    if rank_window is None:
+        return JsonResponse({'status': 'error', 'message': 'Student is not on this leaderboard'}, status=404)
+    
+    def serialize(entry, rank=None):
+        return {
+            'student': entry.student_id,
+            'name': entry.student.get_full_name(),
+            'rank': rank or entry.rank,
+            'total_score': entry.total_score,
+        }
+    
+    return JsonResponse({
+        'status': 'success',
+        'scope': scope,
+        'scope_value': scope_value,
+        'rank': rank_window['rank'],
+        'entry': serialize(rank_window['entry'], rank_window['rank']),
+        'above': [serialize(entry) for entry in rank_window['above']],
+        'below': [serialize(entry) for entry in rank_window['below']],
+    })
+
+
+@login_required
+@role_required('teacher', message="Only teachers can verify reviews.", redirect_to='literacy:leaderboard')
 def teacher_verify_reviews_view(request):
     """Teacher dashboard for verifying book reviews"""
-    user_profile = get_object_or_404(UserProfile, user=request.user)
-    
-    if not user_profile.is_teacher():
-        messages.error(request, "Only teachers can verify reviews.")
-        return redirect('literacy:leaderboard')
+    user_profile = request.profile
     
     # Get pending reviews from teacher's class
     pending_reviews = BookReview.objects.filter(
@@ -218,12 +224,10 @@ def teacher_verify_reviews_view(request):
 
 
 @login_required
+@role_required('teacher', message="Only teachers can verify reviews.", response='forbidden')
 def verify_review_view(request, pk):
     """Verify or reject a single review"""
-    user_profile = get_object_or_404(UserProfile, user=request.user)
-    
-    if not user_profile.is_teacher():
-        return HttpResponseForbidden("Only teachers can verify reviews.")
+    user_profile = request.profile
     
     review = get_object_or_404(BookReview, pk=pk, status='pending')
     
@@ -259,33 +263,31 @@ def verify_review_view(request, pk):
 @login_required
 def forum_view(request):
     """Forum listing - all literacy posts"""
-    posts = LiteracyPost.objects.all().prefetch_related('comments', 'likes')
-    
-    # Filter by search if provided
+    # Search results are ranked by relevance and paged by number
     search_query = request.GET.get('q')
+    sort_by = request.GET.get('sort', 'recent')
+    next_page = None
     if search_query:
-        posts = posts.filter(
-            Q(title__icontains=search_query) |
-            Q(content__icontains=search_query) |
-            Q(student__first_name__icontains=search_query) |
-            Q(student__last_name__icontains=search_query)
+        try:
+            page = max(int(request.GET.get('page', 1)), 1)
+        except ValueError:
+            page = 1
+        posts = LiteracyPost.objects.select_related('student', 'book_review').annotate(
+            user_liked=Exists(
+                LiteracyPost.likes.through.objects.filter(literacypost=OuterRef('pk'), user=request.user)
+            ),
         )
-    
-    # Pagination / sorting
-    sort_by = request.GET.get('sort', 'recent')
-    if sort_by == 'popular':
-        posts = posts.annotate(like_count=Count('likes')).order_by('-like_count', '-created_at')
+        posts, has_next = search_posts(search_query, page, FORUM_PAGE_SIZE, queryset=posts)
+        if has_next:
+            next_page = page + 1
     else:
-        posts = posts.order_by('-created_at')
-    
-    # Add engagement data for each post
-    for post in posts:
-        post.like_count = post.likes.count()
-        post.comment_count = post.comments.count()
-        post.user_liked = request.user in post.likes.all() if request.user.is_authenticated else False
+        # Pagination / sorting; the pages are shared, so likes are marked per user
+        posts = get_forum_page(sort_by, cursor=request.GET.get('cursor'), per_page=FORUM_PAGE_SIZE)
+        mark_liked(posts, request.user)
     
     context = {
         'posts': posts,
+        'next_page': next_page,
         'search_query': search_query or '',
         'sort_by': sort_by,
     }
@@ -324,8 +326,7 @@ def create_post_view(request):
 def post_detail_view(request, pk):
     """View detailed post with comments"""
     post = get_object_or_404(LiteracyPost, pk=pk)
-    post.like_count = post.likes.count()
-    post.user_liked = request.user in post.likes.all()
+    post.user_liked = post.likes.filter(pk=request.user.pk).exists()
     
     if request.method == 'POST':
         if 'comment' in request.POST:
@@ -338,10 +339,7 @@ def post_detail_view(request, pk):
                 messages.success(request, "Comment added!")
                 return redirect('literacy:post_detail', pk=pk)
         elif 'like' in request.POST:
-            if request.user in post.likes.all():
-                post.likes.remove(request.user)
-            else:
-                post.likes.add(request.user)
+            post.toggle_like(request.user)
             return redirect('literacy:post_detail', pk=pk)
     else:
         form = CommentForm()
@@ -379,61 +377,14 @@ def delete_post_view(request, pk):
 
 def calculate_leaderboard_scores():
     """Calculate and update leaderboard scores - run periodically"""
-    from authentication.models import UserProfile
-    
-    # Get all students
-    students = UserProfile.objects.filter(role='student')
-    
-    for student_profile in students:
-        student = student_profile.user
-        
-        # Count verified reviews
-        verified_count = BookReview.objects.filter(
-            student=student,
-            status='verified'
-        ).count()
-        
-        # Calculate consistency score
-        last_month = timezone.now() - timedelta(days=30)
-        reviews_last_month = BookReview.objects.filter(
-            student=student,
-            created_at__gte=last_month
-        ).count()
-        consistency_score = min(reviews_last_month * 10, 100)  # Max 100
-        
-        # Total score calculation
-        total_score = (
-            verified_count * 20 +      # 20 points per verified review
-            consistency_score          # Consistency points
-        )
-        
-        # Update leaderboard for different scopes
-        scopes = [
-            ('class', student_profile.kelas),
-            ('school', 'school'),
-        ]
-        
-        for scope, scope_value in scopes:
-            if scope == 'class' and not scope_value:
-                continue
-            
-            LiteracyLeaderboard.objects.update_or_create(
-                student=student,
-                scope=scope,
-                scope_value=scope_value,
-                defaults={
-                    'books_read': verified_count,
-                    'verified_reviews': verified_count,
-                    'consistency_score': consistency_score,
-                    'total_score': total_score,
-                }
-            )
+    return recalculate_leaderboard()
 
 
 def get_reading_stats(user):
     """Get reading stats for gamification"""
+    review_stats = get_review_stats(user)
     return {
-        'reviews_count': BookReview.objects.filter(student=user).count(),
-        'verified_count': BookReview.objects.filter(student=user, status='verified').count(),
-        'pending_count': BookReview.objects.filter(student=user, status='pending').count(),
+        'reviews_count': review_stats['total'],
+        'verified_count': review_stats['verified'],
+        'pending_count': review_stats['pending'],
     }
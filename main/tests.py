@@ -1,3 +1,52 @@
 from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from unittest import mock
 
-# Create your tests here.
+from authentication.models import UserProfile
+from nasa_library.cache import bump_namespace, cache_stats, get_or_compute, make_key
+
+
+class SharedCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.compute = mock.Mock(side_effect=lambda: self.compute.call_count)
+
+    def test_hit_miss_and_namespace_bump(self):
+        self.assertEqual(get_or_compute('books', ['X 1'], self.compute), 1)
+        self.assertEqual(get_or_compute('books', ['X 1'], self.compute), 1)
+        self.assertEqual(get_or_compute('other', ['X 1'], self.compute), 2)
+
+        bump_namespace('books')
+        self.assertEqual(get_or_compute('books', ['X 1'], self.compute), 3)
+        self.assertEqual(
+            cache_stats('books', 'other'),
+            {'books': {'hits': 1, 'misses': 2, 'stale': 0}, 'other': {'hits': 0, 'misses': 1, 'stale': 0}}
+        )
+
+    def test_stale_value_served_while_another_caller_refreshes(self):
+        get_or_compute('books', ['X 1'], self.compute, timeout=0)
+        key = make_key('books', 'X 1')
+
+        # Another caller holds the refresh lock
+        cache.add(f'{key}:lock', 1)
+        self.assertEqual(get_or_compute('books', ['X 1'], self.compute, timeout=0), 1)
+        self.assertEqual(self.compute.call_count, 1)
+
+        cache.delete(f'{key}:lock')
+        self.assertEqual(get_or_compute('books', ['X 1'], self.compute, timeout=0), 2)
+        self.assertEqual(cache_stats('books')['books']['stale'], 2)
+
+    def test_stats_endpoint_is_staff_only(self):
+        user = User.objects.create_user('pustakawan', password='secret')
+        profile = UserProfile.objects.create(user=user, role='student')
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(reverse('main:cache_stats')).status_code, 403)
+
+        profile.role = 'librarian'
+        profile.save()
+        response = self.client.get(reverse('main:cache_stats'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()['caches']), {'leaderboard', 'dashboard', 'forum'})
@@ -1,9 +1,10 @@
 from django.urls import path
 
-from main.views import show_mainpage
+from main.views import show_mainpage, cache_stats_view
 
 app_name = 'main'
 
 urlpatterns = [
     path('', show_mainpage, name='mainpage'),
-]
\ No newline at end of file
+    path('cache-stats/', cache_stats_view, name='cache_stats'),
+]
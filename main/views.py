@@ -1,4 +1,20 @@
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
 from django.shortcuts import render
 
+from authentication.decorators import staff_required
+from nasa_library.cache import cache_stats
+
+# Cache namespaces reported by cache_stats_view
+MONITORED_CACHES = ('leaderboard', 'dashboard', 'forum')
+
+
 def show_mainpage(request):
     return render(request, 'mainpage.html')
+
+
+@login_required
+@staff_required(response='json')
+def cache_stats_view(request):
+    """JSON hit/miss/stale counters of the shared caches, for monitoring"""
+    return JsonResponse({'status': 'success', 'caches': cache_stats(*MONITORED_CACHES)})
@@ -0,0 +1,139 @@
+"""
+Versioned, namespaced caching shared by the apps
+Keys look like '<namespace>:<version>:<part>:...'. bump_namespace() moves a
+namespace to a new version, which orphans all of its keys at once; they
+expire on their own. Values are stored with a "fresh until" time and kept for
+a while after it: once a value goes stale, one caller recomputes it under a
+lock while the others keep serving the stale copy, so an expiry does not
+send every request to the database at the same moment.
+Hits, misses and stale reads are counted per namespace (see cache_stats).
+"""
+import time
+from urllib.parse import quote
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+DEFAULT_TIMEOUT = 5 * 60
+DEFAULT_STALE_TIMEOUT = 5 * 60
+LOCK_TIMEOUT = 30
+# How long a caller without the lock waits for a missing value to appear
+LOCK_WAIT = 2
+LOCK_POLL_INTERVAL = 0.05
+
+STAT_NAMES = ('hits', 'misses', 'stale')
+
+
+def _version_key(namespace):
+    return f'{namespace}:version'
+
+
+def namespace_version(namespace):
+    """The current version of a namespace"""
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so a version evicted from the cache is never reused
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_namespace(namespace):
+    """Invalidate every key of a namespace by moving it to a new version"""
+    key = _version_key(namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def invalidate_namespace(namespace):
+    """
+    Bump a namespace now and again once the current transaction commits, so a
+    value cached from pre-commit data in the meantime is dropped as well
+    """
+    bump_namespace(namespace)
+    transaction.on_commit(lambda: bump_namespace(namespace))
+
+
+def make_key(namespace, *parts):
+    """The cache key for `parts` in the current version of `namespace`"""
+    encoded = ':'.join(quote(str(part), safe='') for part in parts)
+    return f'{namespace}:{namespace_version(namespace)}:{encoded}'
+
+
+def _count(namespace, stat):
+    key = f'{namespace}:stats:{stat}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def cache_stats(*namespaces):
+    """Return {namespace: {'hits', 'misses', 'stale'}} for the given namespaces"""
+    keys = {
+        f'{namespace}:stats:{stat}': (namespace, stat)
+        for namespace in namespaces
+        for stat in STAT_NAMES
+    }
+    values = cache.get_many(list(keys))
+    stats = {namespace: dict.fromkeys(STAT_NAMES, 0) for namespace in namespaces}
+    for key, (namespace, stat) in keys.items():
+        stats[namespace][stat] = values.get(key, 0)
+    return stats
+
+
+def _wait_for(key):
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    return None
+
+
+def store(namespace, parts, value, timeout=DEFAULT_TIMEOUT, stale_timeout=DEFAULT_STALE_TIMEOUT):
+    """Cache `value` for `parts` in `namespace` as get_or_compute would after computing it"""
+    cache.set(make_key(namespace, *parts), (time.time() + timeout, value), timeout + stale_timeout)
+
+
+def get_or_compute(namespace, parts, compute, timeout=DEFAULT_TIMEOUT, stale_timeout=DEFAULT_STALE_TIMEOUT):
+    """
+    Return the cached value for `parts` in `namespace`, calling compute() to
+    fill it on a miss. The value is fresh for `timeout` seconds and served
+    stale for up to `stale_timeout` more while one caller recomputes it.
+    """
+    key = make_key(namespace, *parts)
+    lock_key = f'{key}:lock'
+    entry = cache.get(key)
+
+    if entry is not None:
+        fresh_until, value = entry
+        if fresh_until > time.time():
+            _count(namespace, 'hits')
+            return value
+        _count(namespace, 'stale')
+        if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+            # Someone else is refreshing it
+            return value
+    else:
+        _count(namespace, 'misses')
+        if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+            entry = _wait_for(key)
+            if entry is not None:
+                return entry[1]
+            # The other caller is slow or died; compute without the lock
+            lock_key = None
+
+    try:
+        value = compute()
+        store(namespace, parts, value, timeout, stale_timeout)
+    finally:
+        if lock_key:
+            cache.delete(lock_key)
+    return value
@@ -0,0 +1,77 @@
+"""
+Keyset (seek) pagination shared by the listing views
+Pages are addressed by an opaque cursor holding the sort value and primary key
+of the last row, so fetching page N costs the same as fetching page 1
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class KeysetPage:
+    """A single page of results plus the cursor to the next page"""
+
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def encode_cursor(value, pk):
+    """Encode a (sort value, pk) pair as a URL-safe string"""
+    if isinstance(value, datetime):
+        payload = ['dt', value.isoformat(), pk]
+    else:
+        payload = ['v', value, pk]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor, or return None if it is invalid"""
+    try:
+        kind, value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if kind == 'dt':
+            value = datetime.fromisoformat(value)
+        return value, int(pk)
+    except (ValueError, TypeError):
+        return None
+
+
+def keyset_paginate(queryset, field, cursor=None, per_page=50):
+    """
+    Return the page of `queryset` that follows `cursor`, ordered by
+    (-field, -pk). The caller must not rely on any other ordering. A cursor
+    that does not decode to a valid position is treated as the first page.
+    """
+    queryset = queryset.order_by(f'-{field}', '-pk')
+
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        value, pk = position
+        try:
+            queryset = queryset.filter(
+                Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk})
+            )
+        except ValidationError:
+            pass
+
+    rows = list(queryset[:per_page + 1])
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, field), last.pk)
+
+    return KeysetPage(rows, next_cursor)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -52,6 +53,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'authentication.middleware.ProfileMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -87,6 +89,42 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# CACHE_BACKEND selects the backend: 'locmem', 'file' or 'redis' (any
+# Redis-compatible server), with CACHE_LOCATION as the directory or server URL.
+# locmem is private to each process: namespace bumps (which invalidate the
+# cached leaderboard pages, forum pages and dashboards) and invalidate_profile
+# only reach the worker that made them. It is therefore only the default with
+# DEBUG (a single runserver process); otherwise the default is the file cache,
+# which every worker on the host shares. Use 'redis' across hosts.
+# Tests run with nasa_library.test_settings, which swaps in its own cache.
+
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'nasa-library',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION', BASE_DIR / 'cache'),
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'redis://127.0.0.1:6379/1'),
+    },
+}
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem' if DEBUG else 'file')
+
+CACHES = {
+    'default': {
+        **CACHE_BACKENDS[CACHE_BACKEND],
+        'KEY_PREFIX': 'nasa_library',
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -154,11 +192,23 @@ LOGGING = {
             'level': 'INFO',
             'propagate': True,
         },
+        'attendance': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': True,
+        },
     },
 }
 
-# Django-Crontab Settings - Auto Check-Out at 3:00 PM
+# Django-Crontab Settings - Auto Check-Out at 3:00 PM, nightly leaderboard reconciliation,
+# achievement awarding, monthly ambassador selection
 CRONJOBS = [
     # Auto check-out students at 3:00 PM (15:00) every day
     ('0 15 * * *', 'attendance.cron.auto_checkout_at_closing'),
+    # Reconcile literacy leaderboard scores every night (reviews update them as they happen)
+    ('0 2 * * *', 'literacy.leaderboard.recalculate_leaderboard'),
+    # Award literacy achievements to every student who has earned them
+    ('15 2 * * *', 'literacy.achievements.award_achievements'),
+    # Choose last month's literacy ambassadors on the first of every month
+    ('30 2 1 * *', 'literacy.ambassadors.select_monthly_ambassadors'),
 ]
\ No newline at end of file
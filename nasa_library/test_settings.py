@@ -0,0 +1,16 @@
+"""
+Settings for the test suite
+python manage.py test --settings=nasa_library.test_settings
+Whatever CACHE_BACKEND the environment selects, the tests get a local-memory
+cache of their own so they never touch (or clear) a shared one.
+"""
+from .settings import *  # noqa: F401,F403
+
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'nasa-library-tests',
+        'KEY_PREFIX': 'nasa_library',
+    }
+}
@@ -22,5 +22,6 @@ urlpatterns = [
     path('auth/', include('authentication.urls')),
     path('attendance/', include('attendance.urls')),
     path('literacy/', include('literacy.urls')),
+    path('books/', include('book.urls')),
     path('', include('main.urls')),
 ]